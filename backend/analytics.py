@@ -0,0 +1,337 @@
+"""
+Incrementally maintained feedback analytics.
+Per-course like/dislike/cart counters and the top courses by engagement are
+updated as each feedback event is recorded, instead of being recomputed from
+the whole feedback list on every dashboard refresh. The response payload is
+built once per change and reused until the next event.
+
+ApproximateAnalytics answers the same way from fixed-memory sketches (see
+sketches.py) when exact per-course counters are too much to keep.
+
+Rolling windows (last hour/day/week/term) come from time-bucketed rollups:
+events land in per-minute buckets, and a bucket pushed out of its ring is
+merged into the next coarser ring (minutes -> hours -> days). A window query
+only sums the buckets inside it, so its cost is bounded by the ring sizes, not
+by the amount of feedback.
+"""
+
+from datetime import datetime
+import heapq
+import threading
+import time
+
+from sketches import CountMinSketch, HyperLogLog, SpaceSaving, hash64
+
+ACTION_COUNTERS = {'like': 'likes', 'dislike': 'dislikes', 'add_to_cart': 'cart_adds'}
+COUNTER_FIELDS = ('likes', 'dislikes', 'cart_adds', 'total')
+COUNTER_INDEX = {action: COUNTER_FIELDS.index(counter) for action, counter in ACTION_COUNTERS.items()}
+
+# (bucket seconds, buckets kept) from finest to coarsest
+ROLLUP_LEVELS = ((60, 60), (3600, 24 * 7), (86400, 128))
+WINDOWS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400, 'term': 16 * 7 * 86400}
+# Bucket size of the timeline returned for each window
+TIMELINE_SECONDS = {'hour': 60, 'day': 3600, 'week': 3600, 'term': 86400}
+
+class TopK:
+    """The k keys with the highest counts, for counts that only ever increase.
+
+    Ties go to the key seen first, as with a stable sort over first-seen order.
+    A key outside the top can only get in by passing the current last place,
+    so each increment costs O(k) at most.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.entries = []       # [key] best first
+        self._rank = {}         # key in the top -> (-count, first-seen order); smaller is better
+
+    def update(self, key, count, order):
+        rank = (-count, order)
+        if key not in self._rank:
+            if len(self.entries) >= self.k:
+                if rank >= self._rank[self.entries[-1]]:
+                    return
+                del self._rank[self.entries.pop()]
+            self.entries.append(key)
+        self._rank[key] = rank
+        # Only the changed key moves, and only towards the front
+        i = self.entries.index(key)
+        while i > 0 and self._rank[self.entries[i - 1]] > rank:
+            self.entries[i - 1], self.entries[i] = self.entries[i], self.entries[i - 1]
+            i -= 1
+
+    def __iter__(self):
+        return iter(self.entries)
+
+def event_time(entry, default):
+    """Unix time of a feedback entry's ISO timestamp, or default if it has none"""
+    timestamp = entry.get('timestamp')
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            pass
+    return default
+
+class RollupLevel:
+    """Ring of per-course counter buckets at one resolution"""
+
+    def __init__(self, seconds, size, coarser=None):
+        self.seconds = seconds
+        self.size = size
+        self.coarser = coarser
+        self.tags = [None] * size       # slot -> bucket number it holds
+        self.buckets = [None] * size    # slot -> {course id or None: [likes, dislikes, cart_adds, total]}
+
+    def add(self, bucket_number, counts):
+        """Merge counts into the bucket starting at bucket_number * seconds"""
+        slot = bucket_number % self.size
+        tag = self.tags[slot]
+        if tag is not None and tag > bucket_number:
+            # Older than this ring reaches back: goes straight to the coarser ring
+            if self.coarser is not None:
+                self.coarser.add(bucket_number * self.seconds // self.coarser.seconds, counts)
+            return
+        if tag != bucket_number:
+            if tag is not None and self.coarser is not None:
+                self.coarser.add(tag * self.seconds // self.coarser.seconds, self.buckets[slot])
+            self.tags[slot] = bucket_number
+            self.buckets[slot] = {}
+        bucket = self.buckets[slot]
+        for key, values in counts.items():
+            current = bucket.get(key)
+            if current is None:
+                bucket[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    current[i] += value
+
+    def buckets_since(self, cutoff):
+        """(start time, bucket) for every bucket that ends after cutoff"""
+        for tag, bucket in zip(self.tags, self.buckets):
+            if tag is not None and (tag + 1) * self.seconds > cutoff:
+                yield tag * self.seconds, bucket
+
+class FeedbackRollups:
+    """Minute, hour and day rings of feedback counts"""
+
+    def __init__(self, levels=ROLLUP_LEVELS):
+        self.levels = []
+        coarser = None
+        for seconds, size in reversed(levels):
+            coarser = RollupLevel(seconds, size, coarser)
+            self.levels.insert(0, coarser)
+
+    def add(self, when, course_id, action):
+        values = [0, 0, 0, 1]
+        index = COUNTER_INDEX.get(action)
+        if index is not None:
+            values[index] = 1
+        counts = {None: [0, 0, 0, 1]}       # None counts every event, with or without a course
+        if course_id:
+            counts[course_id] = values
+        finest = self.levels[0]
+        finest.add(int(when // finest.seconds), counts)
+
+    def window(self, seconds, now, timeline_seconds):
+        """(per-course counters, event count, {timeline bucket start: events}) for the last `seconds`"""
+        cutoff = now - seconds
+        totals = {}
+        timeline = {}
+        for level in self.levels:
+            for start, bucket in level.buckets_since(cutoff):
+                for key, values in bucket.items():
+                    if key is None:
+                        point = max(start, cutoff) // timeline_seconds * timeline_seconds
+                        timeline[point] = timeline.get(point, 0) + values[3]
+                        continue
+                    current = totals.get(key)
+                    if current is None:
+                        totals[key] = list(values)
+                    else:
+                        for i, value in enumerate(values):
+                            current[i] += value
+        return totals, sum(timeline.values()), timeline
+
+class FeedbackAnalytics:
+    """Per-course engagement counters plus the top courses, kept up to date by add()"""
+
+    def __init__(self, feedback=(), top_k=10):
+        self.course_counts = {}     # course id -> {'likes', 'dislikes', 'cart_adds', 'total'}
+        self._first_seen = {}       # course id -> order of its first event (breaks top-k ties)
+        self.top = TopK(top_k)
+        self.total_feedback = 0
+        self.rollups = FeedbackRollups()
+        self._lock = threading.Lock()
+        self._payload = None
+        self._window_payloads = {}  # window -> (minute it was built in, payload)
+        self.add_many(feedback)
+
+    def add_many(self, entries):
+        now = time.time()
+        with self._lock:
+            touched = {}
+            for entry in entries:
+                self.total_feedback += 1
+                course_id = entry.get('courseId')
+                self.rollups.add(event_time(entry, now), course_id, entry.get('action'))
+                if not course_id:
+                    continue
+                counts = self.course_counts.get(course_id)
+                if counts is None:
+                    counts = self.course_counts[course_id] = {'likes': 0, 'dislikes': 0, 'cart_adds': 0, 'total': 0}
+                    self._first_seen[course_id] = len(self._first_seen)
+                counter = ACTION_COUNTERS.get(entry.get('action'))
+                if counter:
+                    counts[counter] += 1
+                counts['total'] += 1
+                touched[course_id] = counts
+            # Counts only grow, so one update per course with its final count is enough
+            for course_id, counts in touched.items():
+                self.top.update(course_id, counts['total'], self._first_seen[course_id])
+            self._payload = None
+            self._window_payloads = {}
+
+    def add(self, entry):
+        self.add_many([entry])
+
+    def payload(self):
+        """The /api/analytics response body (shared; do not modify)"""
+        payload = self._payload
+        if payload is None:
+            with self._lock:
+                payload = self._payload = {
+                    'courseEngagement': {course_id: dict(counts) for course_id, counts in self.course_counts.items()},
+                    'topCourses': [{'courseId': course_id, **self.course_counts[course_id]} for course_id in self.top],
+                    'totalFeedback': self.total_feedback
+                }
+        return payload
+
+    def window_payload(self, window, now=None):
+        """The /api/analytics response body for one of WINDOWS, from the rollups.
+
+        Windows are exact to the minute for the last hour and to the bucket
+        size (hour, then day) further back. Rebuilt at most once a minute
+        between events.
+        """
+        now = time.time() if now is None else now
+        minute = int(now // 60)
+        cached = self._window_payloads.get(window)
+        if cached is not None and cached[0] == minute:
+            return cached[1]
+        with self._lock:
+            totals, events, timeline = self.rollups.window(WINDOWS[window], now, TIMELINE_SECONDS[window])
+            # Same tie-break as the all-time top list: first seen overall wins
+            order = self._first_seen
+            top = heapq.nsmallest(self.top.k, totals, key=lambda course_id: (-totals[course_id][3], order[course_id]))
+            payload = {
+                'window': window,
+                'courseEngagement': {
+                    course_id: dict(zip(COUNTER_FIELDS, totals[course_id]))
+                    for course_id in sorted(totals, key=order.__getitem__)
+                },
+                'topCourses': [{'courseId': course_id, **dict(zip(COUNTER_FIELDS, totals[course_id]))} for course_id in top],
+                'totalFeedback': events,
+                'timeline': [
+                    {'start': datetime.fromtimestamp(start).isoformat(), 'count': count}
+                    for start, count in sorted(timeline.items())
+                ]
+            }
+            self._window_payloads[window] = (minute, payload)
+        return payload
+
+class ApproximateAnalytics:
+    """Fixed-memory analytics: Space-Saving top courses, count-min per-course counters and
+    HyperLogLog unique students, answering in the same shape as FeedbackAnalytics.payload().
+
+    Only the courses Space-Saving currently tracks are reported. A course's
+    unique-student sketch starts when it enters the tracked set, so it can
+    undercount courses that were evicted and came back.
+    """
+
+    def __init__(self, feedback=(), top_k=10, capacity=100, width=2048, depth=4, precision=10):
+        self.top_k = top_k
+        self.precision = precision
+        self.heavy = SpaceSaving(capacity)
+        self.counters = CountMinSketch(width, depth, fields=len(COUNTER_FIELDS))
+        self.students = {}          # tracked course id -> HyperLogLog of student ids
+        self.all_students = HyperLogLog(precision)
+        self.total_feedback = 0
+        self._lock = threading.Lock()
+        self._payload = None
+        self.add_many(feedback)
+
+    def add_many(self, entries):
+        with self._lock:
+            keys, rows = [], []
+            for entry in entries:
+                self.total_feedback += 1
+                student_id = entry.get('studentId')
+                student_hash = hash64(student_id, b'hll') if student_id else None
+                if student_hash is not None:
+                    self.all_students.add_hash(student_hash)
+                course_id = entry.get('courseId')
+                if not course_id:
+                    continue
+                values = [0, 0, 0, 1]
+                index = COUNTER_INDEX.get(entry.get('action'))
+                if index is not None:
+                    values[index] = 1
+                keys.append(course_id)
+                rows.append(values)
+                evicted = self.heavy.add(course_id)
+                if evicted is not None:
+                    self.students.pop(evicted, None)
+                if student_hash is not None:
+                    sketch = self.students.get(course_id)
+                    if sketch is None:
+                        sketch = self.students[course_id] = HyperLogLog(self.precision)
+                    sketch.add_hash(student_hash)
+            # One vectorized count-min update per batch
+            self.counters.add_many(keys, rows)
+            self._payload = None
+
+    def add(self, entry):
+        self.add_many([entry])
+
+    def _course(self, course_id, count):
+        estimate = self.counters.estimate(course_id).tolist()
+        # Both sketches only overcount, so the smaller total is the better one
+        estimate[3] = min(estimate[3], count)
+        counts = dict(zip(COUNTER_FIELDS, estimate))
+        sketch = self.students.get(course_id)
+        counts['uniqueStudents'] = sketch.count() if sketch else 0
+        return counts
+
+    def memory_bytes(self):
+        return (self.heavy.memory_bytes() + self.counters.memory_bytes() + self.all_students.memory_bytes()
+                + sum(sketch.memory_bytes() for sketch in self.students.values()))
+
+    def payload(self):
+        """The /api/analytics response body, plus the error bounds of the estimates"""
+        payload = self._payload
+        if payload is None:
+            with self._lock:
+                tracked = self.heavy.top(self.heavy.capacity)
+                engagement = {course_id: self._course(course_id, count) for course_id, count, _ in tracked}
+                overcount, confidence = self.counters.error_bound(self.counters.total)
+                payload = self._payload = {
+                    'courseEngagement': engagement,
+                    'topCourses': [
+                        {'courseId': course_id, **engagement[course_id], 'maxOvercount': error}
+                        for course_id, _, error in tracked[:self.top_k]
+                    ],
+                    'totalFeedback': self.total_feedback,
+                    'uniqueStudents': self.all_students.count(),
+                    'approximate': {
+                        'trackedCourses': len(tracked),
+                        # Top-list totals are at most this much too high
+                        'topCountMaxError': self.heavy.max_error(),
+                        # Per-course counters are at most this much too high, with this probability
+                        'countMaxError': overcount,
+                        'countErrorConfidence': round(confidence, 4),
+                        'uniqueStudentsStandardError': round(self.all_students.standard_error(), 4),
+                        'memoryBytes': self.memory_bytes()
+                    }
+                }
+        return payload
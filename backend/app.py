@@ -1,107 +1,390 @@
-from flask import Flask, request, jsonify
+import time
+_STARTUP_BEGAN = time.perf_counter()
+
+import atexit
+from flask import Flask, request, jsonify, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import json
+import math
 import os
+import sys
+import threading
 from dotenv import load_dotenv
 import re
 from datetime import datetime
-import google.generativeai as genai
+import numpy as np
+from course_index import CourseSearchIndex, course_search_text
+from vector_scoring import CourseFeatureMatrix
+from llm_scoring import CandidateScorer
+from llm_cache import LLMCache
+from intent_memo import QueryIntentMemo
+from circuit_breaker import CircuitBreakerRegistry
+from data_snapshot import read_snapshot, write_snapshot, source_fingerprints
+from repository import Repository, ProfessorRepository
+from feedback_log import FeedbackLog
+from storage import JsonStorage, SQLiteStorage, import_json_data
+from catalog_watcher import CatalogWatcher
+from course_model import Course, to_courses, export_courses, import_courses
+import schedule_model
+from timetable import TimetableSearch, describe_meeting
+from prereq_graph import PrerequisiteGraph, parse_prerequisites
+from gened_planner import Candidate, GenEdPlanner
+from analytics import FeedbackAnalytics, ApproximateAnalytics, WINDOWS as ANALYTICS_WINDOWS
+from feedback_batch import IdempotencyKeys, validate_event
 
 load_dotenv()
 
-# Initialize Gemini
+# Seconds spent in each startup phase, reported at boot and in /api/status
+STARTUP_TIMINGS = {'imports': round(time.perf_counter() - _STARTUP_BEGAN, 4)}
+
+# Gemini is set up on first use ('lazy'), in a background thread right after
+# startup ('background'), or before the server starts ('eager')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    # Try available models in order of preference
-    # Using aliases that automatically point to latest stable versions
-    model_names = [
-        'gemini-flash-latest',      # Alias to latest flash (fast, cost-effective)
-        'gemini-2.5-flash',         # Stable flash model
-        'gemini-2.0-flash',         # Alternative flash
-        'gemini-pro-latest',        # Alias to latest pro (more capable)
-        'gemini-2.5-pro',           # Stable pro model
-        'gemini-2.0-pro-exp',       # Experimental pro
-    ]
-    
-    gemini_model = None
-    for model_name in model_names:
-        try:
-            gemini_model = genai.GenerativeModel(model_name)
-            print(f"✓ Using Gemini model: {model_name}")
-            break
-        except Exception as e:
-            continue
+GEMINI_INIT = os.getenv('GEMINI_INIT', 'lazy').lower()
+GEMINI_MODEL_NAME = None
+gemini_model = None
+_gemini_initialized = False
+_gemini_init_lock = threading.Lock()
+
+def get_gemini_model():
+    """Return the Gemini model, creating it (and importing the client library) on first use"""
+    global gemini_model, GEMINI_MODEL_NAME, _gemini_initialized
+    if gemini_model is not None or _gemini_initialized:
+        return gemini_model
     
-    if gemini_model is None:
-        print("Error: Could not initialize any Gemini model.")
-        print("Please check your API key and available models.")
-else:
-    gemini_model = None
+    with _gemini_init_lock:
+        if _gemini_initialized:
+            return gemini_model
+        started = time.perf_counter()
+        
+        # Deferred: importing the client library dominates cold-start time
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        # Try available models in order of preference
+        # Using aliases that automatically point to latest stable versions
+        model_names = [
+            'gemini-flash-latest',      # Alias to latest flash (fast, cost-effective)
+            'gemini-2.5-flash',         # Stable flash model
+            'gemini-2.0-flash',         # Alternative flash
+            'gemini-pro-latest',        # Alias to latest pro (more capable)
+            'gemini-2.5-pro',           # Stable pro model
+            'gemini-2.0-pro-exp',       # Experimental pro
+        ]
+        
+        model = None
+        for model_name in model_names:
+            try:
+                model = genai.GenerativeModel(model_name)
+                GEMINI_MODEL_NAME = model_name
+                print(f"✓ Using Gemini model: {model_name}")
+                break
+            except Exception as e:
+                continue
+        
+        if model is None:
+            print("Error: Could not initialize any Gemini model.")
+            print("Please check your API key and available models.")
+        
+        gemini_model = model
+        _gemini_initialized = True
+        STARTUP_TIMINGS['model_init'] = round(time.perf_counter() - started, 4)
+        return gemini_model
+
+if not GEMINI_API_KEY:
+    # Nothing to initialize: every Gemini call site uses its fallback
+    _gemini_initialized = True
     print("Warning: GEMINI_API_KEY not found. AI explanations will use fallback mode.")
 
+# Score the catalog with NumPy instead of one calculate_match_score call per course
+VECTORIZED_SCORING = os.getenv('VECTORIZED_SCORING', 'true').lower() != 'false'
+
+# How candidates are scored by Gemini: 'batch' sends them all in one prompt,
+# 'parallel' sends one prompt per candidate over a worker pool
+GEMINI_RERANK_MODE = os.getenv('GEMINI_RERANK_MODE', 'batch').lower()
+
+# Gemini candidate scoring must finish within the deadline (seconds)
+GEMINI_SCORING_WORKERS = int(os.getenv('GEMINI_SCORING_WORKERS', '8'))
+GEMINI_SCORING_DEADLINE = float(os.getenv('GEMINI_SCORING_DEADLINE', '8'))
+CANDIDATE_SCORER = CandidateScorer(max_workers=GEMINI_SCORING_WORKERS)
+
+class CatalogJSONProvider(DefaultJSONProvider):
+    """Serializes Course records like the plain dicts they replace"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Course):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = CatalogJSONProvider(app)
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
 # Get the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(BASE_DIR, 'data'))
+
+# Cache of Gemini responses keyed by model + prompt (set LLM_CACHE_PATH= to keep it in memory only)
+LLM_CACHE = LLMCache(
+    path=os.getenv('LLM_CACHE_PATH', os.path.join(DATA_DIR, 'llm_cache.sqlite3')),
+    memory_entries=int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', '512')),
+    disk_entries=int(os.getenv('LLM_CACHE_DISK_ENTRIES', '20000'))
+)
+
+# Per-call-type circuit breakers: while Gemini is failing or slow, skip straight to the rule-based paths
+GEMINI_BREAKERS = CircuitBreakerRegistry(
+    min_calls=int(os.getenv('GEMINI_BREAKER_MIN_CALLS', '5')),
+    failure_rate=float(os.getenv('GEMINI_BREAKER_FAILURE_RATE', '0.5')),
+    slow_call_seconds=float(os.getenv('GEMINI_BREAKER_SLOW_CALL_SECONDS', '10')),
+    open_seconds=float(os.getenv('GEMINI_BREAKER_OPEN_SECONDS', '30'))
+)
 
-# Load data files
-def load_json(filepath):
-    with open(filepath, 'r') as f:
-        return json.load(f)
+# Extracted query intents, keyed by normalized query + the profile fields the intent prompt uses
+INTENT_MEMO = QueryIntentMemo(max_entries=int(os.getenv('INTENT_MEMO_ENTRIES', '2048')))
 
-COURSES = load_json(os.path.join(DATA_DIR, 'courses.json'))
-PROFESSORS = load_json(os.path.join(DATA_DIR, 'professors.json'))
-STUDENT_PROFILES = load_json(os.path.join(DATA_DIR, 'student_profiles.json'))
-FEEDBACK = load_json(os.path.join(DATA_DIR, 'feedback.json'))
+# Where courses, professors, profiles and feedback are persisted: the data/*.json
+# files (default) or a SQLite database; either way each process loads them once
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+if STORAGE_BACKEND == 'sqlite':
+    STORAGE = SQLiteStorage(os.getenv('STORAGE_PATH', os.path.join(DATA_DIR, 'coursematch.sqlite3')))
+    if STORAGE.is_empty():
+        # Re-checked inside the import transaction in case another worker is importing too
+        import_json_data(DATA_DIR, STORAGE)
+else:
+    # Feedback is appended to a journal and periodically compacted into feedback.json
+    feedback_log = FeedbackLog(
+        os.path.join(DATA_DIR, 'feedback.json'),
+        os.path.join(DATA_DIR, 'feedback.journal.jsonl'),
+        fsync_every=int(os.getenv('FEEDBACK_FSYNC_EVERY', '32')),
+        fsync_interval=float(os.getenv('FEEDBACK_FSYNC_INTERVAL', '1')),
+        compact_every=int(os.getenv('FEEDBACK_COMPACT_EVERY', '10000'))
+    )
+    # Course and profile changes are written behind the request, coalesced per file
+    STORAGE = JsonStorage(
+        DATA_DIR, feedback_log,
+        flush_interval=float(os.getenv('STORAGE_FLUSH_INTERVAL', '2')),
+        flush_max_pending=int(os.getenv('STORAGE_FLUSH_MAX_PENDING', '50'))
+    )
+atexit.register(STORAGE.close)
+
+# Compiled snapshot of the catalog (courses, professors, search index and scoring
+# features), used instead of the JSON files while they are unchanged (JSON storage
+# only). Rebuilt automatically when stale, or by hand with: python app.py --build-snapshot
+DATA_SNAPSHOT = os.getenv('DATA_SNAPSHOT', os.path.join(DATA_DIR, 'catalog_snapshot.bin'))
+SNAPSHOT_SOURCES = [os.path.join(DATA_DIR, 'courses.json'), os.path.join(DATA_DIR, 'professors.json')]
+
+_phase_started = time.perf_counter()
+snapshot = None
+if DATA_SNAPSHOT and STORAGE.name == 'json' and '--build-snapshot' not in sys.argv:
+    snapshot = read_snapshot(DATA_SNAPSHOT, SNAPSHOT_SOURCES)
+
+if snapshot:
+    snapshot, snapshot_arrays = snapshot
+    COURSES = import_courses(snapshot['courses'])
+    PROFESSORS = snapshot['professors']
+    STORAGE.adopt_catalog(COURSES, PROFESSORS)
+    print(f"Loaded catalog snapshot {DATA_SNAPSHOT}")
+else:
+    # Taken before reading, so a snapshot built from this load goes stale if the files change meanwhile
+    snapshot_fingerprints = source_fingerprints(SNAPSHOT_SOURCES) if STORAGE.name == 'json' else None
+    # Courses are held as compact read-only records (see course_model.py)
+    COURSES = to_courses(STORAGE.load_courses())
+    PROFESSORS = STORAGE.load_professors()
+STUDENT_PROFILES = STORAGE.load_profiles()
+FEEDBACK = STORAGE.load_feedback()
+STARTUP_TIMINGS['data_load'] = round(time.perf_counter() - _phase_started, 4)
+
+# Dashboard aggregates, updated by record_feedback() rather than recomputed per request:
+# exact counters (with time windows), or fixed-memory sketches ('approximate')
+ANALYTICS_MODE = os.getenv('ANALYTICS_MODE', 'exact').lower()
+_phase_started = time.perf_counter()
+if ANALYTICS_MODE == 'approximate':
+    ANALYTICS = ApproximateAnalytics(
+        FEEDBACK,
+        capacity=int(os.getenv('ANALYTICS_TOP_CAPACITY', '100')),
+        width=int(os.getenv('ANALYTICS_SKETCH_WIDTH', '2048')),
+        depth=int(os.getenv('ANALYTICS_SKETCH_DEPTH', '4')),
+        precision=int(os.getenv('ANALYTICS_HLL_PRECISION', '10'))
+    )
+else:
+    ANALYTICS = FeedbackAnalytics(FEEDBACK)
+STARTUP_TIMINGS['analytics'] = round(time.perf_counter() - _phase_started, 4)
+
+# Student id -> course ids they added to their cart, oldest first (a dict used as an ordered set)
+STUDENT_CARTS = {}
+_student_carts_lock = threading.Lock()
+
+def index_cart_adds(entries):
+    with _student_carts_lock:
+        for entry in entries:
+            if entry.get('action') == 'add_to_cart' and entry.get('courseId'):
+                STUDENT_CARTS.setdefault(entry.get('studentId'), {})[entry['courseId']] = None
+
+index_cart_adds(FEEDBACK)
+
+def record_feedback(entries):
+    """Persist feedback events, then count them in the analytics and the cart index"""
+    STORAGE.append_feedback(entries)
+    ANALYTICS.add_many(entries)
+    index_cart_adds(entries)
 
-# Save feedback
-def save_feedback():
-    with open(os.path.join(DATA_DIR, 'feedback.json'), 'w') as f:
-        json.dump(FEEDBACK, f, indent=2)
+# Idempotency keys of batched feedback already recorded, so retried batches are not counted twice
+FEEDBACK_BATCH_MAX_EVENTS = int(os.getenv('FEEDBACK_BATCH_MAX_EVENTS', '500'))
+FEEDBACK_KEYS = IdempotencyKeys(int(os.getenv('FEEDBACK_IDEMPOTENCY_KEYS', '100000')), FEEDBACK)
 
-# Save student profiles
-def save_student_profiles():
-    with open(os.path.join(DATA_DIR, 'student_profiles.json'), 'w') as f:
-        json.dump(STUDENT_PROFILES, f, indent=2)
+# Id-keyed views of the data lists; all mutations go through these so lookups stay O(1)
+COURSE_REPO = Repository(COURSES)
+PROFESSOR_REPO = ProfessorRepository(PROFESSORS)
+PROFILE_REPO = Repository(STUDENT_PROFILES)
 
-# Save courses
-def save_courses():
-    with open(os.path.join(DATA_DIR, 'courses.json'), 'w') as f:
-        json.dump(COURSES, f, indent=2)
+def find_instructor(course):
+    """Look up the professor record for a course's instructor (stored as a professor id or a name)"""
+    return PROFESSOR_REPO.find(course.get('instructor'))
+
+def find_student_profile(student_id):
+    """Profile for a student id, defaulting to the first (demo) profile"""
+    return PROFILE_REPO.get(student_id) or STUDENT_PROFILES[0]
+
+_phase_started = time.perf_counter()
+
+# Inverted index over course text and department codes for the recommendation prefilter
+if snapshot:
+    COURSE_INDEX = CourseSearchIndex.from_state(snapshot['course_index'], COURSES)
+else:
+    COURSE_INDEX = CourseSearchIndex(COURSES)
+
+# Prerequisite clauses with transitive closures (same slots as COURSE_INDEX)
+PREREQ_GRAPH = PrerequisiteGraph(COURSE_INDEX)
+
+# Feature matrix for vectorized rule-based scoring (same slots as COURSE_INDEX)
+if snapshot:
+    COURSE_FEATURES = CourseFeatureMatrix.from_arrays(
+        COURSE_INDEX, find_instructor, PREREQ_GRAPH, snapshot['features'], snapshot_arrays
+    )
+else:
+    COURSE_FEATURES = CourseFeatureMatrix(COURSE_INDEX, find_instructor, PREREQ_GRAPH)
+
+STARTUP_TIMINGS['index_build'] = round(time.perf_counter() - _phase_started, 4)
+_snapshot_loaded = snapshot is not None
+snapshot = snapshot_arrays = None
+
+def build_data_snapshot():
+    """Write the catalog snapshot from the data loaded at startup"""
+    vocabularies, arrays = COURSE_FEATURES.export_arrays()
+    write_snapshot(DATA_SNAPSHOT, snapshot_fingerprints, {
+        'courses': export_courses(COURSES),
+        'professors': PROFESSORS,
+        'course_index': COURSE_INDEX.export_state(),
+        'features': vocabularies
+    }, arrays)
+    print(f"Wrote catalog snapshot {DATA_SNAPSHOT}")
+
+# Refresh a missing or stale snapshot so the next worker to start can use it
+if DATA_SNAPSHOT and STORAGE.name == 'json' and not _snapshot_loaded and '--build-snapshot' not in sys.argv:
+    try:
+        build_data_snapshot()
+    except Exception as e:
+        print(f"Error writing catalog snapshot: {e}")
+
+def apply_catalog_changes(added, changed, removed_ids):
+    """Swap reloaded courses into the live catalog, touching only the ones that changed"""
+    updated = [Course.from_dict(course) for course in added + changed]
+    with COURSE_REPO.lock:
+        for course in updated:
+            COURSE_REPO.upsert(course)
+        COURSE_REPO.remove_many(removed_ids)
+        COURSE_INDEX.update_courses(updated, removed_ids)
+        PREREQ_GRAPH.update_courses(updated, removed_ids)
+        COURSE_FEATURES.update_courses(updated)
+
+# Pick up rewrites of courses.json (scrapers, GPA updates) without a restart (JSON storage only)
+CATALOG_RELOAD_INTERVAL = float(os.getenv('CATALOG_RELOAD_INTERVAL', '5'))
+CATALOG_WATCHER = CatalogWatcher(
+    os.path.join(DATA_DIR, 'courses.json'),
+    lambda: {course['id']: course for course in COURSES},
+    apply_catalog_changes,
+    interval=CATALOG_RELOAD_INTERVAL,
+    fingerprint=STORAGE.loaded_fingerprint('courses.json') if STORAGE.name == 'json' else None,
+    local_changes=STORAGE.unsaved_courses if STORAGE.name == 'json' else None
+)
+if CATALOG_RELOAD_INTERVAL > 0 and STORAGE.name == 'json':
+    CATALOG_WATCHER.start()
+if STORAGE.name == 'json':
+    # Flushes of courses.json keep a scraper's newer file, and are not reloaded as outside changes
+    STORAGE.watch_external('courses.json', CATALOG_WATCHER.guard_write)
+
+def parse_gemini_json(response_text):
+    """Parse a JSON reply from Gemini, stripping a surrounding markdown code block"""
+    response_text = response_text.strip()
+    if response_text.startswith('```'):
+        response_text = response_text.split('```')[1]
+        if response_text.startswith('json'):
+            response_text = response_text[4:]
+        response_text = response_text.strip()
+    return json.loads(response_text)
+
+def gemini_generate(prompt, call_type):
+    """Get Gemini's reply text for a prompt, reusing a cached reply when there is one"""
+    cached = LLM_CACHE.get(call_type, GEMINI_MODEL_NAME, prompt)
+    if cached is not None:
+        return cached
+    
+    response_text = GEMINI_BREAKERS.get(call_type).call(lambda: get_gemini_model().generate_content(prompt).text)
+    LLM_CACHE.put(call_type, GEMINI_MODEL_NAME, prompt, response_text)
+    return response_text
+
+def gemini_generate_json(prompt, call_type):
+    """Get Gemini's parsed JSON reply for a prompt; only replies that parse are cached"""
+    cached = LLM_CACHE.get(call_type, GEMINI_MODEL_NAME, prompt)
+    if cached is not None:
+        try:
+            return parse_gemini_json(cached)
+        except ValueError:
+            LLM_CACHE.discard(GEMINI_MODEL_NAME, prompt)
+    
+    response_text = GEMINI_BREAKERS.get(call_type).call(lambda: get_gemini_model().generate_content(prompt).text)
+    result = parse_gemini_json(response_text)
+    LLM_CACHE.put(call_type, GEMINI_MODEL_NAME, prompt, response_text)
+    return result
 
 # Course matching logic
 def calculate_match_score_with_gemini(course, student_profile, query, query_intent):
     """Use Gemini to calculate intelligent match score based on semantic understanding"""
-    if not gemini_model:
+    if not get_gemini_model():
         # Fallback to rule-based scoring
         return calculate_match_score(course, student_profile, query_intent.get('keywords', []))
     
     try:
-        # Build course context
-        instructor = next((p for p in PROFESSORS if p['id'] == course.get('instructor')), None)
-        instructor_info = ""
-        if instructor:
-            instructor_info = f"Instructor: {instructor.get('name', 'TBA')}, Rating: {instructor.get('rating', 'N/A')}, Background: {instructor.get('background', 'N/A')}"
-        
-        # Include syllabus content if available (more comprehensive)
-        syllabus_info = ""
-        syllabus_available = False
-        if course.get('syllabus'):
-            syllabus_available = True
-            syllabus_full = course['syllabus']
-            # Include more syllabus content for better analysis (up to 3000 chars)
-            syllabus_info = f"""
+        return score_course_with_gemini(course, student_profile, query, query_intent)
+    except Exception as e:
+        print(f"Error calculating match score with Gemini: {e}")
+        # Fallback to rule-based
+        return calculate_match_score(course, student_profile, query_intent.get('keywords', []))
+
+def build_course_context(course):
+    """Describe a course for a Gemini prompt; returns (course_context, syllabus_available)"""
+    instructor = find_instructor(course)
+    instructor_info = ""
+    if instructor:
+        instructor_info = f"Instructor: {instructor.get('name', 'TBA')}, Rating: {instructor.get('rating', 'N/A')}, Background: {instructor.get('background', 'N/A')}"
+    
+    # Include syllabus content if available (more comprehensive)
+    syllabus_info = ""
+    syllabus_available = False
+    if course.get('syllabus'):
+        syllabus_available = True
+        syllabus_full = course['syllabus']
+        # Include more syllabus content for better analysis (up to 3000 chars)
+        syllabus_info = f"""
 Syllabus Content (available - use this for detailed analysis):
 {syllabus_full[:3000]}{'...' if len(syllabus_full) > 3000 else ''}
 
 Syllabus Topics: {', '.join(course.get('syllabusTopics', []))}
 Syllabus Skills: {', '.join(course.get('syllabusSkills', []))}
 """
-        
-        course_context = f"""
+    
+    course_context = f"""
 Course: {course.get('title', 'N/A')} ({course.get('id', 'N/A')})
 Department: {course.get('department', 'N/A')}
 Description: {course.get('description', 'N/A')}
@@ -115,8 +398,11 @@ Schedule: {', '.join([s.get('time', '') for s in course.get('schedule', [])])}
 {syllabus_info}
 {instructor_info}
 """
-        
-        student_context = f"""
+    return course_context, syllabus_available
+
+def build_student_context(student_profile):
+    """Describe a student profile for a Gemini scoring prompt"""
+    return f"""
 Student Profile:
 - Major: {', '.join(student_profile.get('major', []))}
 - Minor: {', '.join(student_profile.get('minor', []))}
@@ -127,11 +413,24 @@ Student Profile:
 - Difficulty Preference: {student_profile.get('typicalDifficultyPreference', 3)}/5
 - GenEd Remaining: {', '.join(student_profile.get('genedRemaining', []))}
 """
-        
-        # Build enhanced prompt with syllabus emphasis
-        syllabus_instruction = ""
-        if syllabus_available:
-            syllabus_instruction = """
+
+def validate_gemini_score(score, reasons):
+    """(score clamped to 0-100, reasons as strings); raises ValueError if either has the wrong type"""
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError(f'Gemini score is not a number: {score!r}')
+    if not isinstance(reasons, list):
+        raise ValueError('Gemini reasons are not a list')
+    return max(0, min(100, score)), [str(r) for r in reasons if isinstance(r, (str, int, float))]
+
+def score_course_with_gemini(course, student_profile, query, query_intent):
+    """Ask Gemini for a (score, reasons) match; raises if the call fails or its JSON or score is invalid"""
+    course_context, syllabus_available = build_course_context(course)
+    student_context = build_student_context(student_profile)
+    
+    # Build enhanced prompt with syllabus emphasis
+    syllabus_instruction = ""
+    if syllabus_available:
+        syllabus_instruction = """
 IMPORTANT: This course has a syllabus available. When providing match reasons, include specific insights from the syllabus content such as:
 - Specific topics covered that align with the student's query
 - Skills taught that match career goals
@@ -139,8 +438,8 @@ IMPORTANT: This course has a syllabus available. When providing match reasons, i
 - Course structure or teaching methods that fit the student's preferences
 - Any specific requirements or focus areas mentioned in the syllabus
 """
-        
-        prompt = f"""You are an intelligent course recommendation system. Evaluate how well this course matches the student's query and profile.
+    
+    prompt = f"""You are an intelligent course recommendation system. Evaluate how well this course matches the student's query and profile.
 
 Student Query: "{query}"
 
@@ -175,26 +474,10 @@ When syllabus is available, make your reasons more specific and detailed by refe
 
 Return ONLY valid JSON, no additional text."""
 
-        response = gemini_model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up response
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-        
-        result = json.loads(response_text)
-        score = result.get('score', 0)
-        reasons = result.get('reasons', [])
-        
-        return score, reasons
-        
-    except Exception as e:
-        print(f"Error calculating match score with Gemini: {e}")
-        # Fallback to rule-based
-        return calculate_match_score(course, student_profile, query_intent.get('keywords', []))
+    result = gemini_generate_json(prompt, 'score')
+    if not isinstance(result, dict):
+        raise ValueError('Gemini score reply is not a JSON object')
+    return validate_gemini_score(result.get('score'), result.get('reasons'))
 
 def calculate_match_score(course, student_profile, query_keywords=None):
     """Calculate how well a course matches a student profile (rule-based fallback)"""
@@ -221,21 +504,10 @@ def calculate_match_score(course, student_profile, query_keywords=None):
     
     # Keyword matching with query (including syllabus content and department codes)
     if query_keywords:
-        course_keywords = ' '.join(course.get('keywords', [])).lower()
-        course_text = (course.get('title', '') + ' ' + course.get('description', '')).lower()
+        # Title, description, first 2000 chars of syllabus, syllabus topics/skills
+        course_text, course_keywords = course_search_text(course)
         course_dept = course.get('department', '').lower()
         
-        # Include syllabus content if available for better matching
-        if course.get('syllabus'):
-            syllabus_text = course.get('syllabus', '').lower()
-            course_text += ' ' + syllabus_text[:2000]  # Include first 2000 chars of syllabus
-        
-        # Also check syllabus topics and skills if available
-        if course.get('syllabusTopics'):
-            course_text += ' ' + ' '.join(course.get('syllabusTopics', [])).lower()
-        if course.get('syllabusSkills'):
-            course_text += ' ' + ' '.join(course.get('syllabusSkills', [])).lower()
-        
         matched_keywords = []
         matches = 0
         
@@ -282,15 +554,17 @@ def calculate_match_score(course, student_profile, query_keywords=None):
     elif diff_diff == 1:
         score += 10
     
-    # Prerequisites check
-    completed = set(student_profile.get('completedCourses', []))
-    prereqs = set(course.get('prerequisites', []))
-    if prereqs.issubset(completed):
+    # Prerequisites check: course codes named in the prerequisites, counting
+    # everything the completed courses themselves required (see prereq_graph.py)
+    completed = PREREQ_GRAPH.implied_codes(student_profile.get('completedCourses', []))
+    clauses = parse_prerequisites(course.get('prerequisites', []))
+    met = [clause for clause in clauses if completed.intersection(clause)]
+    if len(met) == len(clauses):
         score += 20
         reasons.append("You meet all prerequisites")
-    elif len(prereqs & completed) > 0:
+    elif met:
         score += 10
-        reasons.append(f"Partial prerequisites met: {', '.join(prereqs & completed)}")
+        reasons.append(f"Partial prerequisites met: {', '.join(sorted(completed.intersection(code for clause in met for code in clause)))}")
     else:
         score -= 10
     
@@ -308,9 +582,14 @@ def calculate_match_score(course, student_profile, query_keywords=None):
         score += 15
         reasons.append("Aligned with your major/minor")
     
+    # Time-of-day preference (query wording like "morning" beats the profile's timePreferences)
+    preferred = schedule_model.preferred_windows(student_profile, query_keywords)
+    if preferred and schedule_model.fits_preferences(course, schedule_model.preference_mask(preferred)):
+        score += 10
+        reasons.append(f"Meets at your preferred time ({', '.join(preferred)})")
+    
     # Instructor rating
-    instructor_id = course.get('instructor')
-    instructor = next((p for p in PROFESSORS if p['id'] == instructor_id), None)
+    instructor = find_instructor(course)
     if instructor:
         if instructor.get('rating', 0) >= 4.5:
             score += 10
@@ -337,6 +616,99 @@ def calculate_match_score(course, student_profile, query_keywords=None):
     
     return max(0, score), reasons
 
+def rerank_with_gemini(candidates, student_profile, query, query_intent):
+    """Score all candidates with a single Gemini prompt; returns {course_id: (score, reasons)}.
+
+    Only well-formed items for known candidates are returned, so callers can
+    fall back to rule-based scoring for anything missing. Raises if the call
+    or its JSON fails.
+    """
+    student_context = build_student_context(student_profile)
+    course_contexts = []
+    any_syllabus = False
+    for i, course in enumerate(candidates, 1):
+        course_context, syllabus_available = build_course_context(course)
+        any_syllabus = any_syllabus or syllabus_available
+        course_contexts.append(f"--- Candidate {i} (id: {course.get('id')}) ---{course_context}")
+    
+    syllabus_instruction = ""
+    if any_syllabus:
+        syllabus_instruction = """
+IMPORTANT: Some courses have a syllabus available. For those, include specific insights from the syllabus content in the reasons (topics covered, skills taught, learning outcomes, course structure, specific requirements)."""
+    
+    prompt = f"""You are an intelligent course recommendation system. Evaluate how well EACH candidate course below matches the student's query and profile.
+
+Student Query: "{query}"
+
+Query Intent:
+{json.dumps(query_intent, indent=2)}
+
+{student_context}
+
+Candidate Courses:
+{''.join(course_contexts)}
+{syllabus_instruction}
+
+Rate every candidate on a scale of 0-100 and provide 2-4 specific, detailed reasons why it's a good or poor match.
+
+Return a JSON array with one object per candidate, using the candidate's id exactly as given:
+[
+  {{"id": "<course id>", "score": <number 0-100>, "reasons": ["reason1", "reason2", "reason3", "reason4"]}}
+]
+
+Consider:
+- Semantic relevance to the query (not just keyword matching)
+- Career alignment
+- Prerequisites and student readiness
+- Difficulty match
+- Schedule preferences
+- Instructor quality
+- GenEd requirements
+- Overall fit with student goals
+
+Return ONLY valid JSON, no additional text."""
+
+    items = gemini_generate_json(prompt, 'rerank')
+    if isinstance(items, dict):
+        # Tolerate the array being wrapped in an object, e.g. {"courses": [...]}
+        items = next((v for v in items.values() if isinstance(v, list)), [])
+    
+    candidate_ids = {course.get('id') for course in candidates}
+    scores = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        course_id = item.get('id')
+        if course_id not in candidate_ids or course_id in scores:
+            continue
+        try:
+            scores[course_id] = validate_gemini_score(item.get('score'), item.get('reasons'))
+        except ValueError:
+            continue
+    return scores
+
+def rerank_candidates(candidates, student_profile, query, query_intent, query_keywords):
+    """Batched Gemini reranking; returns (score, reasons, llm_scored) per candidate"""
+    try:
+        llm_scores = CANDIDATE_SCORER.call(
+            lambda: rerank_with_gemini(candidates, student_profile, query, query_intent),
+            GEMINI_SCORING_DEADLINE
+        )
+    except Exception as e:
+        print(f"Error reranking candidates with Gemini: {e!r}")
+        llm_scores = {}
+    
+    results = []
+    for course in candidates:
+        if course.get('id') in llm_scores:
+            score, reasons = llm_scores[course['id']]
+            results.append((score, reasons, True))
+        else:
+            score, reasons = calculate_match_score(course, student_profile, query_keywords)
+            results.append((score, reasons, False))
+    print(f"Gemini reranked {len(llm_scores)}/{len(candidates)} candidates in one request")
+    return results
+
 def extract_keywords_from_query(query):
     """Extract relevant keywords from natural language query (fallback method)"""
     query_lower = query.lower()
@@ -404,18 +776,27 @@ def extract_keywords_from_query(query):
     
     return keywords
 
+def keyword_intent(query):
+    """Query intent from simple keyword extraction, in the shape Gemini returns"""
+    return {
+        'keywords': extract_keywords_from_query(query),
+        'career_goals': [],
+        'topics': [],
+        'schedule_preferences': [],
+        'difficulty_preference': None,
+        'instructor_preferences': []
+    }
+
 def extract_query_intent_with_gemini(query, student_profile):
     """Use Gemini to extract structured intent and requirements from natural language query"""
-    if not gemini_model:
+    if not get_gemini_model():
         # Fallback to simple keyword extraction
-        return {
-            'keywords': extract_keywords_from_query(query),
-            'career_goals': [],
-            'topics': [],
-            'schedule_preferences': [],
-            'difficulty_preference': None,
-            'instructor_preferences': []
-        }
+        return keyword_intent(query)
+    
+    # Repeat phrasings from an unchanged profile reuse the earlier intent
+    intent = INTENT_MEMO.get(query, student_profile)
+    if intent is not None:
+        return intent
     
     try:
         prompt = f"""Analyze this student's course search query and extract structured information.
@@ -448,95 +829,101 @@ Pay special attention to:
 
 Return ONLY valid JSON, no additional text."""
 
-        response = gemini_model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up response (remove markdown code blocks if present)
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-        
-        intent = json.loads(response_text)
+        intent = gemini_generate_json(prompt, 'intent')
+        INTENT_MEMO.put(query, student_profile, intent)
         return intent
         
     except Exception as e:
         print(f"Error extracting query intent with Gemini: {e}")
         # Fallback
-        return {
-            'keywords': extract_keywords_from_query(query),
-            'career_goals': [],
-            'topics': [],
-            'schedule_preferences': [],
-            'difficulty_preference': None,
-            'instructor_preferences': []
-        }
+        return keyword_intent(query)
 
-def get_course_recommendations(student_id, query):
-    """Get personalized course recommendations using Gemini AI for intelligent matching"""
-    student_profile = next((s for s in STUDENT_PROFILES if s['id'] == student_id), STUDENT_PROFILES[0])
-    
-    # Use Gemini to extract query intent (semantic understanding)
-    query_intent = extract_query_intent_with_gemini(query, student_profile)
-    
-    # Hybrid approach: Pre-filter with rule-based, then use Gemini for intelligent scoring
-    query_keywords = query_intent.get('keywords', extract_keywords_from_query(query))
-    
-    # Step 1: Quick pre-filtering with rule-based scoring to get candidates
+def cart_entries(cart):
+    """([(course, chosen section time or None)], unknown course ids) for a cart.
+
+    Cart items are course ids or {'courseId': ..., 'time': ...} with the chosen
+    section's time; a time that is not a string counts as no section chosen.
+    """
+    entries, unknown = [], []
+    for item in cart or []:
+        course_id, section_time = (item.get('courseId'), item.get('time')) if isinstance(item, dict) else (item, None)
+        if not isinstance(section_time, str):
+            section_time = None
+        course = COURSE_REPO.get(course_id) if isinstance(course_id, str) else None
+        if course is None:
+            unknown.append(course_id)
+        elif all(course['id'] != entry[0]['id'] for entry in entries):
+            entries.append((course, section_time))
+    return entries, unknown
+
+def cart_busy_mask(cart):
+    """Weekly mask of the time taken by the courses in a student's cart.
+
+    Without a chosen section, only time shared by all of a course's sections
+    counts as taken.
+    """
+    busy = 0
+    for course, section_time in cart_entries(cart)[0]:
+        busy |= schedule_model.required_mask(course, section_time)
+    return busy
+
+def student_cart(student_id):
+    """Course ids a student added to their cart through /api/feedback, oldest first"""
+    with _student_carts_lock:
+        return list(STUDENT_CARTS.get(student_id, ()))
+
+def prefilter_courses(student_profile, query_keywords, busy_mask=0):
+    """Rule-based (course, score) pairs with a positive score, best first"""
+    # Only courses sharing a term with the query are scored; with no keywords
+    # (or nothing matching) every course is still considered. Courses that
+    # cannot be fit around busy_mask (the cart) are dropped.
     prefiltered_courses = []
-    for course in COURSES:
-        score, _ = calculate_match_score(course, student_profile, query_keywords)
-        if score > 0:
-            prefiltered_courses.append((course, score))
-    
-    # Sort by rule-based score and take top 20 candidates
-    prefiltered_courses.sort(key=lambda x: x[1], reverse=True)
-    candidates = [course for course, _ in prefiltered_courses[:20]]
-    
-    # Step 2: Use Gemini for intelligent semantic scoring of top candidates
-    scored_courses = []
-    
-    if gemini_model and candidates:
-        print(f"Using Gemini to intelligently score {len(candidates)} candidate courses...")
-        for course in candidates:
-            # Use Gemini for intelligent scoring
-            score, reasons = calculate_match_score_with_gemini(course, student_profile, query, query_intent)
-            
+    if VECTORIZED_SCORING:
+        slots = COURSE_INDEX.search_slots(query_keywords) or COURSE_INDEX.all_slots()
+        scores = COURSE_FEATURES.score(student_profile, query_keywords, slots)
+        if busy_mask:
+            scores[COURSE_FEATURES.conflicts(busy_mask, slots)] = 0
+        for slot, score in zip(slots, scores.tolist()):
             if score > 0:
-                instructor = next((p for p in PROFESSORS if p['id'] == course.get('instructor')), None)
-                scored_courses.append({
-                    'course': course,
-                    'score': score,
-                    'reasons': reasons,
-                    'instructor': instructor
-                })
+                prefiltered_courses.append((COURSE_INDEX.course_at(slot), score))
     else:
-        # Fallback: use rule-based scoring for all prefiltered courses
-        for course, _ in prefiltered_courses:
-            score, reasons = calculate_match_score(course, student_profile, query_keywords)
+        search_pool = COURSE_INDEX.search(query_keywords) or COURSES
+        for course in search_pool:
+            if busy_mask and schedule_model.conflicts(course, busy_mask):
+                continue
+            score, _ = calculate_match_score(course, student_profile, query_keywords)
             if score > 0:
-                instructor = next((p for p in PROFESSORS if p['id'] == course.get('instructor')), None)
-                scored_courses.append({
-                    'course': course,
-                    'score': score,
-                    'reasons': reasons,
-                    'instructor': instructor
-                })
+                prefiltered_courses.append((course, score))
     
+    prefiltered_courses.sort(key=lambda x: x[1], reverse=True)
+    return prefiltered_courses
+
+def build_recommendation(course, score, reasons, llm_scored=False):
+    return {
+        'course': course,
+        'score': score,
+        'reasons': reasons,
+        'instructor': find_instructor(course),
+        'llm_scored': llm_scored
+    }
+
+def rule_based_recommendations(prefiltered_courses, student_profile, query_keywords):
+    """Recommendations with reasons from calculate_match_score for the prefiltered courses"""
+    # Only the top 10 can make it into the (diversified) top 5, so reasons are built for those
+    scored_courses = []
+    for course, _ in prefiltered_courses[:10]:
+        score, reasons = calculate_match_score(course, student_profile, query_keywords)
+        if score > 0:
+            scored_courses.append(build_recommendation(course, score, reasons))
+    return scored_courses
+
+def select_recommendations(scored_courses, query_intent, query_keywords):
+    """Pick the top 5 recommendations, spread across departments for multi-topic queries"""
     # Sort by score
-    scored_courses.sort(key=lambda x: x['score'], reverse=True)
+    scored_courses = sorted(scored_courses, key=lambda x: x['score'], reverse=True)
     
     # Ensure diversity: if query mentions multiple topics, try to return courses from different departments/topics
     if len(query_intent.get('topics', [])) > 1 or len(query_keywords) > 2:
-        # Group courses by department
-        courses_by_dept = {}
-        for item in scored_courses:
-            dept = item['course'].get('department', 'OTHER')
-            if dept not in courses_by_dept:
-                courses_by_dept[dept] = []
-            courses_by_dept[dept].append(item)
-        
         # Try to get diverse results (at least one from each relevant department)
         diverse_results = []
         used_departments = set()
@@ -562,22 +949,123 @@ def get_course_recommendations(student_id, query):
     # If single topic or fewer keywords, just return top 5
     return scored_courses[:5]
 
-def generate_ai_explanation(courses_data, query, student_profile):
-    """Generate AI-powered explanation for recommendations using Gemini"""
+def candidate_scoring_call_type():
+    """Gemini call type (and circuit) used to score recommendation candidates"""
+    return 'rerank' if GEMINI_RERANK_MODE == 'batch' else 'score'
+
+def get_course_recommendations(student_id, query, cart=None):
+    """Get personalized course recommendations using Gemini AI for intelligent matching"""
+    student_profile = find_student_profile(student_id)
     
-    # Fallback explanation if Gemini is not available
-    if not gemini_model:
-        explanation = f"Based on your query '{query}', I found {len(courses_data)} great matches for you. "
-        if courses_data:
-            top_course = courses_data[0]
-            explanation += f"\n\n**{top_course['course']['title']}** is the top match because: "
-            explanation += "; ".join(top_course['reasons'][:3])
-            if len(courses_data) > 1:
-                explanation += f"\n\nHere are {len(courses_data)} courses ranked by how well they fit your profile:"
+    # Use Gemini to extract query intent (semantic understanding)
+    query_intent = extract_query_intent_with_gemini(query, student_profile)
+    
+    # Hybrid approach: Pre-filter with rule-based, then use Gemini for intelligent scoring
+    query_keywords = query_intent.get('keywords', extract_keywords_from_query(query))
+    
+    # Step 1: Quick pre-filtering with rule-based scoring; take the top 20 as candidates
+    prefiltered_courses = prefilter_courses(student_profile, query_keywords, cart_busy_mask(cart))
+    candidates = [course for course, _ in prefiltered_courses[:20]]
+    
+    # Step 2: Use Gemini for intelligent semantic scoring of top candidates (unless its circuit is open)
+    if get_gemini_model() and candidates and not GEMINI_BREAKERS.is_open(candidate_scoring_call_type()):
+        print(f"Using Gemini to intelligently score {len(candidates)} candidate courses...")
+        if GEMINI_RERANK_MODE == 'batch':
+            # One prompt for all candidates; any missing from the reply keep their rule-based score
+            results = rerank_candidates(candidates, student_profile, query, query_intent, query_keywords)
         else:
-            explanation += "I couldn't find perfect matches, but I've suggested some relevant alternatives."
-        return explanation
+            # Score all candidates concurrently; any not done by the deadline keep their rule-based score
+            results = CANDIDATE_SCORER.score_all(
+                candidates,
+                lambda course: score_course_with_gemini(course, student_profile, query, query_intent),
+                lambda course: calculate_match_score(course, student_profile, query_keywords),
+                GEMINI_SCORING_DEADLINE
+            )
+        scored_courses = [
+            build_recommendation(course, score, reasons, llm_scored)
+            for course, (score, reasons, llm_scored) in zip(candidates, results)
+            if score > 0
+        ]
+    else:
+        # Fallback: use rule-based scoring for the prefiltered courses
+        scored_courses = rule_based_recommendations(prefiltered_courses, student_profile, query_keywords)
+    
+    return select_recommendations(scored_courses, query_intent, query_keywords)
+
+def stream_course_recommendations(student_id, query, cart=None):
+    """Yield (event, data) pairs: rule-based results first, then LLM-refined scores and results, then the explanation"""
+    student_profile = find_student_profile(student_id)
+    busy_mask = cart_busy_mask(cart)
+    
+    # The first results use plain keyword extraction, so they go out before any Gemini call
+    query_intent = keyword_intent(query)
+    query_keywords = query_intent['keywords']
+    prefiltered_courses = prefilter_courses(student_profile, query_keywords, busy_mask)
+    recommendations = select_recommendations(
+        rule_based_recommendations(prefiltered_courses, student_profile, query_keywords),
+        query_intent, query_keywords
+    )
+    yield 'results', {
+        'stage': 'rule-based',
+        'courses': [format_course_recommendation(rec) for rec in recommendations]
+    }
+    
+    # Redo the rule-based pass with the Gemini intent (the same intent without Gemini)
+    gemini_intent = extract_query_intent_with_gemini(query, student_profile)
+    if gemini_intent != query_intent:
+        query_intent = gemini_intent
+        query_keywords = query_intent.get('keywords', query_keywords)
+        prefiltered_courses = prefilter_courses(student_profile, query_keywords, busy_mask)
+        intent_recommendations = select_recommendations(
+            rule_based_recommendations(prefiltered_courses, student_profile, query_keywords),
+            query_intent, query_keywords
+        )
+        if [rec['course']['id'] for rec in intent_recommendations] != [rec['course']['id'] for rec in recommendations]:
+            yield 'results', {
+                'stage': 'intent',
+                'courses': [format_course_recommendation(rec) for rec in intent_recommendations]
+            }
+        recommendations = intent_recommendations
+    candidates = [course for course, _ in prefiltered_courses[:20]]
     
+    if get_gemini_model() and candidates and not GEMINI_BREAKERS.is_open(candidate_scoring_call_type()):
+        if GEMINI_RERANK_MODE == 'batch':
+            results = rerank_candidates(candidates, student_profile, query, query_intent, query_keywords)
+            for course, (score, reasons, llm_scored) in zip(candidates, results):
+                if llm_scored:
+                    yield 'score', {'id': course['id'], 'matchScore': score, 'matchReasons': reasons, 'llmScored': True}
+        else:
+            results = [None] * len(candidates)
+            for i, score, reasons, llm_scored in CANDIDATE_SCORER.iter_scores(
+                candidates,
+                lambda course: score_course_with_gemini(course, student_profile, query, query_intent),
+                lambda course: calculate_match_score(course, student_profile, query_keywords),
+                GEMINI_SCORING_DEADLINE
+            ):
+                results[i] = (score, reasons, llm_scored)
+                if llm_scored:
+                    yield 'score', {'id': candidates[i]['id'], 'matchScore': score, 'matchReasons': reasons, 'llmScored': True}
+        
+        recommendations = select_recommendations([
+            build_recommendation(course, score, reasons, llm_scored)
+            for course, (score, reasons, llm_scored) in zip(candidates, results)
+            if score > 0
+        ], query_intent, query_keywords)
+        yield 'results', {
+            'stage': 'refined',
+            'courses': [format_course_recommendation(rec) for rec in recommendations]
+        }
+    
+    for chunk in stream_ai_explanation(recommendations, query, student_profile):
+        yield 'explanation', {'text': chunk}
+    
+    yield 'done', {
+        'count': len(recommendations),
+        'llmScoredCount': sum(1 for rec in recommendations if rec.get('llm_scored'))
+    }
+
+def build_explanation_prompt(courses_data, query, student_profile):
+    """Prompt asking Gemini to explain the recommendations to the student"""
     # Build context for Gemini
     courses_summary = []
     for i, rec in enumerate(courses_data[:5], 1):  # Top 5 courses
@@ -601,7 +1089,7 @@ def generate_ai_explanation(courses_data, query, student_profile):
     - GPA: {student_profile.get('gpa', 'N/A')}
     """
     
-    prompt = f"""You are a helpful course advisor for university students. Generate a natural, conversational explanation for course recommendations.
+    return f"""You are a helpful course advisor for university students. Generate a natural, conversational explanation for course recommendations.
 
 Student Query: "{query}"
 
@@ -618,19 +1106,79 @@ Please generate a friendly, personalized explanation (2-3 paragraphs) that:
 
 Keep it conversational and helpful, as if you're a friendly academic advisor."""
 
-    try:
-        response = gemini_model.generate_content(prompt)
-        explanation = response.text
-        return explanation
-    except Exception as e:
-        print(f"Error calling Gemini API: {e}")
-        # Fallback to template-based explanation
+def fallback_explanation(courses_data, query):
+    """Template-based explanation used when the Gemini call fails"""
+    explanation = f"Based on your query '{query}', I found {len(courses_data)} great matches for you. "
+    if courses_data:
+        top_course = courses_data[0]
+        explanation += f"\n\n**{top_course['course']['title']}** is the top match because: "
+        explanation += "; ".join(top_course['reasons'][:3])
+    return explanation
+
+def generate_ai_explanation(courses_data, query, student_profile):
+    """Generate AI-powered explanation for recommendations using Gemini"""
+    
+    # Fallback explanation if Gemini is not available
+    if not get_gemini_model():
         explanation = f"Based on your query '{query}', I found {len(courses_data)} great matches for you. "
         if courses_data:
             top_course = courses_data[0]
             explanation += f"\n\n**{top_course['course']['title']}** is the top match because: "
             explanation += "; ".join(top_course['reasons'][:3])
+            if len(courses_data) > 1:
+                explanation += f"\n\nHere are {len(courses_data)} courses ranked by how well they fit your profile:"
+        else:
+            explanation += "I couldn't find perfect matches, but I've suggested some relevant alternatives."
         return explanation
+    
+    prompt = build_explanation_prompt(courses_data, query, student_profile)
+
+    try:
+        explanation = gemini_generate(prompt, 'explanation')
+        return explanation
+    except Exception as e:
+        print(f"Error calling Gemini API: {e}")
+        # Fallback to template-based explanation
+        return fallback_explanation(courses_data, query)
+
+def stream_ai_explanation(courses_data, query, student_profile):
+    """Yield the recommendation explanation in chunks as Gemini generates it"""
+    if not get_gemini_model():
+        yield generate_ai_explanation(courses_data, query, student_profile)
+        return
+    
+    prompt = build_explanation_prompt(courses_data, query, student_profile)
+    cached = LLM_CACHE.get('explanation', GEMINI_MODEL_NAME, prompt)
+    if cached is not None:
+        yield cached
+        return
+    
+    breaker = GEMINI_BREAKERS.get('explanation')
+    if not breaker.allow():
+        yield fallback_explanation(courses_data, query)
+        return
+    
+    chunks = []
+    started = time.monotonic()
+    try:
+        for chunk in get_gemini_model().generate_content(prompt, stream=True):
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+    except GeneratorExit:
+        # The client disconnected mid-stream: Gemini did not fail, but a half-open probe must be let go
+        breaker.release()
+        raise
+    except Exception as e:
+        breaker.record(True, time.monotonic() - started)
+        print(f"Error streaming from Gemini API: {e}")
+        # Text already sent cannot be taken back; only fall back if nothing went out
+        if not chunks:
+            yield fallback_explanation(courses_data, query)
+        return
+    breaker.record(False, time.monotonic() - started)
+    
+    LLM_CACHE.put('explanation', GEMINI_MODEL_NAME, prompt, ''.join(chunks))
 
 @app.route('/', methods=['GET'])
 def index():
@@ -640,6 +1188,7 @@ def index():
         'version': '1.0.0',
         'endpoints': {
             'POST /api/chat': 'Get course recommendations based on natural language query',
+            'POST /api/chat/stream': 'Stream course recommendations and explanation as Server-Sent Events',
             'GET /api/profile?studentId=<id>': 'Get student profile',
             'POST /api/profile': 'Update student profile',
             'POST /api/feedback': 'Submit feedback on courses',
@@ -647,11 +1196,41 @@ def index():
             'GET /api/courses': 'Get all courses',
             'GET /api/professors': 'Get all professors',
             'POST /api/syllabus/upload': 'Upload course syllabus (faculty)',
-            'GET /api/syllabus/<course_id>': 'Get syllabus for a course'
+            'GET /api/syllabus/<course_id>': 'Get syllabus for a course',
+            'GET /api/status': 'Get LLM cache, intent memo, Gemini circuit breaker and startup timing status'
         },
         'status': 'running'
     })
 
+def format_course_recommendation(rec):
+    """Shape a recommendation for the chat API response"""
+    course = rec['course']
+    instructor = rec['instructor']
+    return {
+        'id': course['id'],
+        'title': course['title'],
+        'department': course['department'],
+        'credits': course['credits'],
+        'description': course['description'],
+        'difficulty': course['difficulty'],
+        'typicalGrade': course.get('typicalGrade', 'N/A'),
+        'averageGPA': course.get('averageGPA'),
+        'schedule': course['schedule'],
+        'gened': course.get('gened', []),
+        'careerRelevance': course.get('careerRelevance', []),
+        'prerequisites': course.get('prerequisites', []),
+        'matchScore': rec['score'],
+        'matchReasons': rec['reasons'],
+        'llmScored': rec.get('llm_scored', False),
+        'instructor': {
+            'name': instructor['name'] if instructor else 'TBA',
+            'rating': instructor['rating'] if instructor else None,
+            'background': instructor['background'] if instructor else '',
+            'teachingStyle': instructor.get('teachingStyle', ''),
+            'entrepreneurship': instructor.get('entrepreneurship', False) if instructor else False
+        } if instructor else None
+    }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint for course recommendations"""
@@ -661,46 +1240,241 @@ def chat():
     
     if not message:
         return jsonify({'error': 'Message required'}), 400
+    cart = data.get('cart')
+    if cart is not None and not isinstance(cart, list):
+        return jsonify({'error': 'cart must be a list'}), 400
     
-    # Get recommendations
-    recommendations = get_course_recommendations(student_id, message)
+    # Get recommendations, dropping courses that cannot be scheduled around the cart
+    cart = cart or student_cart(student_id)
+    recommendations = get_course_recommendations(student_id, message, cart)
     
     # Format response
-    courses_response = []
-    for rec in recommendations:
-        course = rec['course']
-        instructor = rec['instructor']
-        courses_response.append({
-            'id': course['id'],
-            'title': course['title'],
-            'department': course['department'],
-            'credits': course['credits'],
-            'description': course['description'],
-            'difficulty': course['difficulty'],
-            'typicalGrade': course.get('typicalGrade', 'N/A'),
-            'averageGPA': course.get('averageGPA'),
-            'schedule': course['schedule'],
-            'gened': course.get('gened', []),
-            'careerRelevance': course.get('careerRelevance', []),
-            'prerequisites': course.get('prerequisites', []),
-            'matchScore': rec['score'],
-            'matchReasons': rec['reasons'],
-            'instructor': {
-                'name': instructor['name'] if instructor else 'TBA',
-                'rating': instructor['rating'] if instructor else None,
-                'background': instructor['background'] if instructor else '',
-                'teachingStyle': instructor.get('teachingStyle', ''),
-                'entrepreneurship': instructor.get('entrepreneurship', False) if instructor else False
-            } if instructor else None
-        })
+    courses_response = [format_course_recommendation(rec) for rec in recommendations]
     
-    student_profile = next((s for s in STUDENT_PROFILES if s['id'] == student_id), STUDENT_PROFILES[0])
+    student_profile = find_student_profile(student_id)
     explanation = generate_ai_explanation(recommendations, message, student_profile)
     
     return jsonify({
         'message': explanation,
         'courses': courses_response,
-        'count': len(courses_response)
+        'count': len(courses_response),
+        'llmScoredCount': sum(1 for rec in recommendations if rec.get('llm_scored'))
+    })
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streaming chat endpoint (Server-Sent Events).
+
+    Events: 'results' with rule-based courses from the query's keywords, 'results'
+    again if the Gemini query intent changes them, 'score' as each candidate
+    gets its LLM score, 'results' with the refined courses, 'explanation' text
+    chunks, and finally 'done'.
+    """
+    data = request.json
+    student_id = data.get('studentId', 'student_demo')
+    message = data.get('message', '')
+    
+    if not message:
+        return jsonify({'error': 'Message required'}), 400
+    cart = data.get('cart')
+    if cart is not None and not isinstance(cart, list):
+        return jsonify({'error': 'cart must be a list'}), 400
+    cart = cart or student_cart(student_id)
+    
+    def generate():
+        try:
+            for event, payload in stream_course_recommendations(student_id, message, cart):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            print(f"Error streaming recommendations: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Timetable search: longest it may run per request, and the most courses/results it takes
+TIMETABLE_TIME_BUDGET = float(os.getenv('TIMETABLE_TIME_BUDGET', '0.5'))
+TIMETABLE_MAX_COURSES = 12
+TIMETABLE_MAX_RESULTS = 50
+
+def format_timetable_section(course, time_string, sections):
+    return {
+        'courseId': course['id'],
+        'title': course.get('title', ''),
+        'time': time_string,
+        **describe_meeting(time_string),
+        'locations': sorted({section.get('location', 'TBA') for section in sections})
+    }
+
+@app.route('/api/timetable', methods=['POST'])
+def timetable():
+    """Conflict-free section combinations for a cart, best time-preference fit first.
+
+    Takes 'courseIds' or 'cart' (see cart_entries); defaults to the student's
+    add_to_cart feedback. Optional 'timePreferences', 'limit' and 'timeBudgetMs'.
+    """
+    data = request.json or {}
+    student_id = data.get('studentId', 'student_demo')
+    cart = data.get('cart') or data.get('courseIds') or student_cart(student_id)
+    if not isinstance(cart, list) or not cart:
+        return jsonify({'error': 'courseIds or cart required'}), 400
+    entries, unknown = cart_entries(cart)
+    if not entries:
+        return jsonify({'error': 'None of the requested courses were found', 'unknown': unknown}), 404
+    if len(entries) > TIMETABLE_MAX_COURSES:
+        return jsonify({'error': f'At most {TIMETABLE_MAX_COURSES} courses per timetable'}), 400
+    
+    preferences = data.get('timePreferences')
+    if preferences is None:
+        preferences = find_student_profile(student_id).get('timePreferences', [])
+    elif not isinstance(preferences, list) or not all(isinstance(p, str) for p in preferences):
+        return jsonify({'error': 'timePreferences must be a list of time windows'}), 400
+    windows = schedule_model.preferred_windows({'timePreferences': preferences})
+    try:
+        limit = min(max(int(data.get('limit', 10)), 1), TIMETABLE_MAX_RESULTS)
+        time_budget = float(data.get('timeBudgetMs', TIMETABLE_TIME_BUDGET * 1000)) / 1000
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({'error': 'limit and timeBudgetMs must be numbers'}), 400
+    if not math.isfinite(time_budget):
+        return jsonify({'error': 'timeBudgetMs must be a finite number'}), 400
+    time_budget = min(max(time_budget, 0.0), TIMETABLE_TIME_BUDGET)
+    
+    search = TimetableSearch(entries, schedule_model.preference_mask(windows), limit, time_budget)
+    results = search.run()
+    scheduled = len(search.courses)
+    
+    return jsonify({
+        'timetables': [{
+            # Average share of class time inside the preferred windows
+            'preferenceFit': round(fit / scheduled, 3) if scheduled else 1.0,
+            'daysOnCampus': -neg_days,
+            'sections': [
+                format_timetable_section(search.courses[index][0], sections[0]['time'], sections)
+                for index, _, sections in choices
+            ]
+        } for fit, neg_days, _, choices in results],
+        'timePreferences': windows,
+        'unscheduled': [course['id'] for course in search.unscheduled],
+        'unknown': unknown,
+        'complete': search.complete,
+        'searchNodes': search.nodes,
+        'elapsedMs': round(search.elapsed * 1000, 2)
+    })
+
+def course_summary(course_id):
+    course = COURSE_REPO.get(course_id)
+    return {'courseId': course_id, 'title': course.get('title', '') if course else ''}
+
+@app.route('/api/prerequisites/unlocks', methods=['GET'])
+def prerequisite_unlocks():
+    """What a student can take now and which courses each of those would open up next"""
+    student_id = request.args.get('studentId', 'student_demo')
+    completed = find_student_profile(student_id).get('completedCourses', [])
+    unlocks = PREREQ_GRAPH.unlocks(completed)
+    steps = PREREQ_GRAPH.steps_away(completed)
+    
+    return jsonify({
+        'studentId': student_id,
+        'next': [
+            {**course_summary(course_id), 'unlocks': [course_summary(unlocked) for unlocked in unlocked_ids]}
+            for course_id, unlocked_ids in sorted(unlocks.items(), key=lambda item: (-len(item[1]), item[0]))
+        ],
+        # Courses with prerequisites still to take, nearest first
+        'blocked': [
+            {**course_summary(course_id), 'stepsAway': count, 'missing': PREREQ_GRAPH.missing(course_id, completed)}
+            for course_id, count in sorted(steps.items(), key=lambda item: (item[1], item[0]))
+            if count > 0
+        ]
+    })
+
+@app.route('/api/prerequisites/<course_id>', methods=['GET'])
+def prerequisite_status(course_id):
+    """Eligibility of one course for a student, and how many terms of prerequisites remain"""
+    if COURSE_REPO.get(course_id) is None:
+        return jsonify({'error': 'Course not found'}), 404
+    student_id = request.args.get('studentId', 'student_demo')
+    completed = find_student_profile(student_id).get('completedCourses', [])
+    
+    return jsonify({
+        **course_summary(course_id),
+        'eligible': PREREQ_GRAPH.is_eligible(course_id, completed),
+        'stepsAway': PREREQ_GRAPH.steps_of(course_id, completed),
+        'missing': PREREQ_GRAPH.missing(course_id, completed)
+    })
+
+# GenEd planner: longest one plan may search before returning the best found so far
+GENED_PLANNER_TIME_BUDGET = float(os.getenv('GENED_PLANNER_TIME_BUDGET', '0.2'))
+
+@app.route('/api/planner/gened', methods=['GET', 'POST'])
+def gened_plan():
+    """A small set of courses covering the student's remaining GenEd requirements.
+
+    Only courses the student is eligible for, has not taken, rates at most one
+    above their preferred difficulty and can schedule around the cart (and each
+    other) are used; closer to the preferred difficulty is better.
+    """
+    if request.method == 'POST':
+        data = request.json or {}
+        requested = data.get('genedRemaining')
+        if requested is not None and (not isinstance(requested, list) or not all(isinstance(r, str) for r in requested)):
+            return jsonify({'error': 'genedRemaining must be a list of requirement names'}), 400
+        if data.get('cart') is not None and not isinstance(data.get('cart'), list):
+            return jsonify({'error': 'cart must be a list'}), 400
+    else:
+        data = request.args
+        # ?genedRemaining=Writing&genedRemaining=Ethics or ?genedRemaining=Writing,Ethics
+        requested = [name.strip() for value in request.args.getlist('genedRemaining') for name in value.split(',') if name.strip()]
+    student_id = data.get('studentId', 'student_demo')
+    profile = find_student_profile(student_id)
+    requirements = list(dict.fromkeys(requested or profile.get('genedRemaining', [])))
+    completed = profile.get('completedCourses', [])
+    preferred = profile.get('typicalDifficultyPreference', 3)
+    cart = data.get('cart') if request.method == 'POST' else None
+    cart = cart or student_cart(student_id)
+    
+    slots = np.asarray(COURSE_INDEX.all_slots(), dtype=np.int64)
+    coverage = COURSE_FEATURES.gened_coverage(requirements, slots)
+    difficulty = COURSE_FEATURES.column('difficulty', slots)
+    eligible, _ = PREREQ_GRAPH.slot_status(completed, int(slots.max()) + 1 if len(slots) else 0)
+    busy_mask = cart_busy_mask(cart)
+    # Courses that clash with the cart in every section are dropped before the planner prunes candidates
+    usable = (coverage > 0) & eligible[slots] & (difficulty <= preferred + 1) & ~COURSE_FEATURES.conflicts(busy_mask, slots)
+    
+    taken = PREREQ_GRAPH.implied_codes(completed)
+    cart_ids = {course['id'] for course, _ in cart_entries(cart)[0]}
+    candidates = []
+    for i in np.flatnonzero(usable).tolist():
+        course = COURSE_INDEX.course_at(int(slots[i]))
+        if course['id'] not in taken and course['id'] not in cart_ids:
+            candidates.append(Candidate(course, int(coverage[i]), abs(float(difficulty[i]) - preferred)))
+    
+    planner = GenEdPlanner(candidates, (1 << len(requirements)) - 1, busy_mask, GENED_PLANNER_TIME_BUDGET)
+    plan = planner.run()
+    covered = 0
+    for candidate in plan:
+        covered |= candidate.cover
+    
+    return jsonify({
+        'studentId': student_id,
+        'requirements': requirements,
+        'plan': [{
+            'courseId': candidate.course['id'],
+            'title': candidate.course.get('title', ''),
+            'department': candidate.course.get('department', ''),
+            'difficulty': candidate.course.get('difficulty', 3),
+            'credits': candidate.course.get('credits', 3),
+            'covers': [requirement for i, requirement in enumerate(requirements) if candidate.cover >> i & 1]
+        } for candidate in plan],
+        'covered': [requirement for i, requirement in enumerate(requirements) if covered >> i & 1],
+        'uncovered': [requirement for i, requirement in enumerate(requirements) if not covered >> i & 1],
+        'totalCredits': sum(candidate.course.get('credits', 3) for candidate in plan),
+        'complete': planner.complete,
+        'candidates': len(planner.candidates),
+        'searchNodes': planner.nodes,
+        'elapsedMs': round(planner.elapsed * 1000, 2)
     })
 
 @app.route('/api/profile', methods=['GET', 'POST'])
@@ -708,7 +1482,7 @@ def profile():
     """Get or update student profile"""
     if request.method == 'GET':
         student_id = request.args.get('studentId', 'student_demo')
-        profile = next((s for s in STUDENT_PROFILES if s['id'] == student_id), STUDENT_PROFILES[0])
+        profile = find_student_profile(student_id)
         return jsonify(profile)
     
     elif request.method == 'POST':
@@ -716,47 +1490,48 @@ def profile():
         student_id = data.get('id', 'student_demo')
         
         # Find the profile to update
-        profile_index = next((i for i, p in enumerate(STUDENT_PROFILES) if p['id'] == student_id), None)
-        
-        if profile_index is not None:
-            # Update existing profile
-            # Keep the id and update all other fields
-            updated_profile = {
-                'id': student_id,
-                'major': data.get('major', STUDENT_PROFILES[profile_index].get('major', [])),
-                'minor': data.get('minor', STUDENT_PROFILES[profile_index].get('minor', [])),
-                'gpa': data.get('gpa', STUDENT_PROFILES[profile_index].get('gpa', 0.0)),
-                'completedCourses': data.get('completedCourses', STUDENT_PROFILES[profile_index].get('completedCourses', [])),
-                'interests': data.get('interests', STUDENT_PROFILES[profile_index].get('interests', [])),
-                'careerGoals': data.get('careerGoals', STUDENT_PROFILES[profile_index].get('careerGoals', [])),
-                'timePreferences': data.get('timePreferences', STUDENT_PROFILES[profile_index].get('timePreferences', [])),
-                'learningStyle': data.get('learningStyle', STUDENT_PROFILES[profile_index].get('learningStyle', '')),
-                'genedRemaining': data.get('genedRemaining', STUDENT_PROFILES[profile_index].get('genedRemaining', [])),
-                'typicalDifficultyPreference': data.get('typicalDifficultyPreference', STUDENT_PROFILES[profile_index].get('typicalDifficultyPreference', 3))
-            }
-            STUDENT_PROFILES[profile_index] = updated_profile
-        else:
-            # Create new profile if it doesn't exist
-            new_profile = {
-                'id': student_id,
-                'major': data.get('major', []),
-                'minor': data.get('minor', []),
-                'gpa': data.get('gpa', 0.0),
-                'completedCourses': data.get('completedCourses', []),
-                'interests': data.get('interests', []),
-                'careerGoals': data.get('careerGoals', []),
-                'timePreferences': data.get('timePreferences', []),
-                'learningStyle': data.get('learningStyle', ''),
-                'genedRemaining': data.get('genedRemaining', []),
-                'typicalDifficultyPreference': data.get('typicalDifficultyPreference', 3)
-            }
-            STUDENT_PROFILES.append(new_profile)
-        
-        # Save to file
-        save_student_profiles()
+        with PROFILE_REPO.lock:
+            previous_profile = PROFILE_REPO.get(student_id)
+            
+            if previous_profile is not None:
+                # Update existing profile
+                # Keep the id and update all other fields
+                updated_profile = {
+                    'id': student_id,
+                    'major': data.get('major', previous_profile.get('major', [])),
+                    'minor': data.get('minor', previous_profile.get('minor', [])),
+                    'gpa': data.get('gpa', previous_profile.get('gpa', 0.0)),
+                    'completedCourses': data.get('completedCourses', previous_profile.get('completedCourses', [])),
+                    'interests': data.get('interests', previous_profile.get('interests', [])),
+                    'careerGoals': data.get('careerGoals', previous_profile.get('careerGoals', [])),
+                    'timePreferences': data.get('timePreferences', previous_profile.get('timePreferences', [])),
+                    'learningStyle': data.get('learningStyle', previous_profile.get('learningStyle', '')),
+                    'genedRemaining': data.get('genedRemaining', previous_profile.get('genedRemaining', [])),
+                    'typicalDifficultyPreference': data.get('typicalDifficultyPreference', previous_profile.get('typicalDifficultyPreference', 3))
+                }
+            else:
+                # Create new profile if it doesn't exist
+                new_profile = {
+                    'id': student_id,
+                    'major': data.get('major', []),
+                    'minor': data.get('minor', []),
+                    'gpa': data.get('gpa', 0.0),
+                    'completedCourses': data.get('completedCourses', []),
+                    'interests': data.get('interests', []),
+                    'careerGoals': data.get('careerGoals', []),
+                    'timePreferences': data.get('timePreferences', []),
+                    'learningStyle': data.get('learningStyle', ''),
+                    'genedRemaining': data.get('genedRemaining', []),
+                    'typicalDifficultyPreference': data.get('typicalDifficultyPreference', 3)
+                }
+                updated_profile = new_profile
+            PROFILE_REPO.upsert(updated_profile)
+            
+            # Persist the profile
+            STORAGE.save_profile(updated_profile)
         
-        # Get the updated profile
-        updated_profile = STUDENT_PROFILES[profile_index] if profile_index is not None else STUDENT_PROFILES[-1]
+        # Memoized intents depend on major, minor, career goals, interests and completed courses
+        INTENT_MEMO.profile_updated(previous_profile, updated_profile)
         
         return jsonify({'success': True, 'message': 'Profile updated', 'profile': updated_profile})
 
@@ -770,36 +1545,74 @@ def feedback():
         'studentId': data.get('studentId', 'anonymous'),
         'timestamp': datetime.now().isoformat()
     }
-    FEEDBACK.append(feedback_entry)
-    save_feedback()
+    record_feedback([feedback_entry])
     return jsonify({'success': True})
 
+@app.route('/api/feedback/batch', methods=['POST'])
+def feedback_batch():
+    """Submit buffered feedback events in one request.
+
+    Body: {"studentId": default for the events, "events": [{"courseId", "action",
+    "timestamp" (client ISO time), "idempotencyKey", optional "studentId"}]}.
+    Every event gets a status: accepted, duplicate (key already recorded) or
+    rejected (with an error). Accepted events are stored with one write.
+    """
+    data = request.json or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'events must be a non-empty list'}), 400
+    if len(events) > FEEDBACK_BATCH_MAX_EVENTS:
+        return jsonify({'error': f'At most {FEEDBACK_BATCH_MAX_EVENTS} events per batch'}), 400
+
+    now = datetime.now()
+    default_student = data.get('studentId', 'anonymous')
+    results = []
+    valid = []                  # (result, entry)
+    for position, event in enumerate(events):
+        entry, error = validate_event(event, default_student, lambda course_id: course_id in COURSE_REPO, now)
+        result = {'index': position, 'idempotencyKey': event.get('idempotencyKey') if isinstance(event, dict) else None}
+        if error:
+            result.update(status='rejected', error=error)
+        else:
+            result['status'] = 'duplicate'
+            valid.append((result, entry))
+        results.append(result)
+
+    for position in FEEDBACK_KEYS.record_new([entry for _, entry in valid], record_feedback):
+        valid[position][0]['status'] = 'accepted'
+
+    counts = {status: 0 for status in ('accepted', 'duplicate', 'rejected')}
+    for result in results:
+        counts[result['status']] += 1
+    return jsonify({'success': True, **counts, 'results': results})
+
 @app.route('/api/analytics', methods=['GET'])
 def analytics():
-    """Get aggregated analytics for faculty dashboard"""
-    # Count feedback by course
-    course_counts = {}
-    for entry in FEEDBACK:
-        course_id = entry.get('courseId')
-        action = entry.get('action')
-        if course_id:
-            if course_id not in course_counts:
-                course_counts[course_id] = {'likes': 0, 'dislikes': 0, 'cart_adds': 0, 'total': 0}
-            if action == 'like':
-                course_counts[course_id]['likes'] += 1
-            elif action == 'dislike':
-                course_counts[course_id]['dislikes'] += 1
-            elif action == 'add_to_cart':
-                course_counts[course_id]['cart_adds'] += 1
-            course_counts[course_id]['total'] += 1
-    
-    # Get top courses by engagement
-    top_courses = sorted(course_counts.items(), key=lambda x: x[1]['total'], reverse=True)[:10]
-    
+    """Get aggregated analytics for faculty dashboard (maintained as feedback arrives).
+
+    ?window=hour|day|week|term limits the counts to recent feedback and adds a
+    timeline of events over the window.
+    """
+    window = request.args.get('window')
+    if window in (None, '', 'all'):
+        return jsonify(ANALYTICS.payload())
+    if window not in ANALYTICS_WINDOWS:
+        return jsonify({'error': f"window must be one of: all, {', '.join(ANALYTICS_WINDOWS)}"}), 400
+    if ANALYTICS_MODE == 'approximate':
+        return jsonify({'error': 'Windowed analytics need ANALYTICS_MODE=exact'}), 400
+    return jsonify(ANALYTICS.window_payload(window))
+
+@app.route('/api/status', methods=['GET'])
+def status():
+    """Get operational statistics for monitoring"""
     return jsonify({
-        'courseEngagement': course_counts,
-        'topCourses': [{'courseId': k, **v} for k, v in top_courses],
-        'totalFeedback': len(FEEDBACK)
+        'llmCache': LLM_CACHE.stats(),
+        'intentMemo': INTENT_MEMO.stats(),
+        'geminiCircuits': GEMINI_BREAKERS.stats(),
+        'startup': STARTUP_TIMINGS,
+        'storage': STORAGE.stats(),
+        'feedbackBatches': FEEDBACK_KEYS.stats(),
+        'catalogWatcher': CATALOG_WATCHER.stats()
     })
 
 @app.route('/api/courses', methods=['GET'])
@@ -814,10 +1627,14 @@ def professors():
 
 def match_syllabus_to_course(syllabus_text, suggested_course_id=None):
     """Use Gemini to match uploaded syllabus to the correct course"""
-    if not gemini_model:
+    if not get_gemini_model():
         # Fallback: if course_id is provided, use it
         if suggested_course_id:
-            return suggested_course_id
+            return {
+                'courseId': suggested_course_id,
+                'confidence': 100,
+                'reason': 'Using suggested course ID (Gemini unavailable)'
+            }
         return None
     
     try:
@@ -857,17 +1674,7 @@ Return a JSON object with:
 
 If no good match is found, set courseId to null. Return ONLY valid JSON."""
 
-        response = gemini_model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean up response
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-        
-        result = json.loads(response_text)
+        result = gemini_generate_json(prompt, 'syllabus_match')
         course_id = result.get('courseId')
         confidence = result.get('confidence', 0)
         
@@ -944,22 +1751,15 @@ def upload_syllabus():
         
         course_id = match_result['courseId']
         
-        # Find the course and update it with syllabus
-        course_index = next((i for i, c in enumerate(COURSES) if c['id'] == course_id), None)
-        
-        if course_index is None:
+        if course_id not in COURSE_REPO:
             return jsonify({'error': f'Course {course_id} not found'}), 404
         
         # Store syllabus content (truncate if too long)
         syllabus_content = syllabus_text[:10000]  # Limit to 10k chars
         
-        # Update course with syllabus
-        COURSES[course_index]['syllabus'] = syllabus_content
-        COURSES[course_index]['syllabusUploaded'] = True
-        COURSES[course_index]['syllabusUploadDate'] = datetime.now().isoformat()
-        
         # Extract keywords and topics from syllabus using Gemini
-        if gemini_model:
+        extracted = {}
+        if get_gemini_model():
             try:
                 extract_prompt = f"""Extract key information from this course syllabus:
 
@@ -976,47 +1776,55 @@ Return a JSON object with:
 
 Return ONLY valid JSON."""
 
-                extract_response = gemini_model.generate_content(extract_prompt)
-                extract_text = extract_response.text.strip()
-                
-                if extract_text.startswith('```'):
-                    extract_text = extract_text.split('```')[1]
-                    if extract_text.startswith('json'):
-                        extract_text = extract_text[4:]
-                    extract_text = extract_text.strip()
-                
-                extracted = json.loads(extract_text)
-                
-                # Update course with extracted information
-                if extracted.get('keywords'):
-                    existing_keywords = COURSES[course_index].get('keywords', [])
-                    COURSES[course_index]['keywords'] = list(set(existing_keywords + extracted['keywords']))
-                
-                if extracted.get('topics'):
-                    COURSES[course_index]['syllabusTopics'] = extracted['topics']
-                
-                if extracted.get('skills'):
-                    COURSES[course_index]['syllabusSkills'] = extracted['skills']
-                
-                if extracted.get('prerequisites'):
-                    existing_prereqs = COURSES[course_index].get('prerequisites', [])
-                    COURSES[course_index]['prerequisites'] = list(set(existing_prereqs + extracted['prerequisites']))
-                
-                if extracted.get('careerRelevance'):
-                    existing_careers = COURSES[course_index].get('careerRelevance', [])
-                    COURSES[course_index]['careerRelevance'] = list(set(existing_careers + extracted['careerRelevance']))
-                    
+                extracted = gemini_generate_json(extract_prompt, 'syllabus_extract')
             except Exception as e:
                 print(f"Error extracting syllabus info: {e}")
         
-        # Save courses
-        save_courses()
+        # Build the updated course as a copy and swap it in, so concurrent
+        # recommendation requests see either the old or the new version
+        with COURSE_REPO.lock:
+            course = dict(COURSE_REPO.get(course_id))
+            
+            # Update course with syllabus
+            course['syllabus'] = syllabus_content
+            course['syllabusUploaded'] = True
+            course['syllabusUploadDate'] = datetime.now().isoformat()
+            
+            # Update course with extracted information
+            if extracted.get('keywords'):
+                existing_keywords = course.get('keywords', [])
+                course['keywords'] = list(set(existing_keywords + extracted['keywords']))
+            
+            if extracted.get('topics'):
+                course['syllabusTopics'] = extracted['topics']
+            
+            if extracted.get('skills'):
+                course['syllabusSkills'] = extracted['skills']
+            
+            if extracted.get('prerequisites'):
+                existing_prereqs = course.get('prerequisites', [])
+                course['prerequisites'] = list(set(existing_prereqs + extracted['prerequisites']))
+            
+            if extracted.get('careerRelevance'):
+                existing_careers = course.get('careerRelevance', [])
+                course['careerRelevance'] = list(set(existing_careers + extracted['careerRelevance']))
+            
+            course = Course.from_dict(course)
+            COURSE_REPO.upsert(course)
+            
+            # Keep the search index, prerequisite graph and feature matrix in sync with the updated course
+            COURSE_INDEX.update_course(course)
+            PREREQ_GRAPH.update_courses([course])
+            COURSE_FEATURES.update_course(course)
+            
+            # Persist the updated course
+            STORAGE.save_course(course)
         
         return jsonify({
             'success': True,
             'message': f'Syllabus uploaded and matched to {course_id}',
             'courseId': course_id,
-            'courseTitle': COURSES[course_index]['title'],
+            'courseTitle': course['title'],
             'matchConfidence': match_result['confidence'],
             'matchReason': match_result['reason']
         })
@@ -1028,7 +1836,7 @@ Return ONLY valid JSON."""
 @app.route('/api/syllabus/<course_id>', methods=['GET'])
 def get_syllabus(course_id):
     """Get syllabus for a specific course"""
-    course = next((c for c in COURSES if c['id'] == course_id), None)
+    course = COURSE_REPO.get(course_id)
     if not course:
         return jsonify({'error': 'Course not found'}), 404
     
@@ -1042,5 +1850,17 @@ def get_syllabus(course_id):
         'uploadDate': course.get('syllabusUploadDate')
     })
 
+# Model initialization outside the request path, per GEMINI_INIT (timed as model_init by get_gemini_model)
+if GEMINI_INIT == 'eager':
+    get_gemini_model()
+elif GEMINI_INIT == 'background' and not _gemini_initialized:
+    threading.Thread(target=get_gemini_model, name='gemini-init', daemon=True).start()
+
+STARTUP_TIMINGS['total'] = round(time.perf_counter() - _STARTUP_BEGAN, 4)
+print("Startup timings (s): " + ", ".join(f"{phase}={seconds}" for phase, seconds in STARTUP_TIMINGS.items()))
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+    if '--build-snapshot' in sys.argv:
+        build_data_snapshot()
+    else:
+        app.run(debug=True, port=5001)
@@ -0,0 +1,138 @@
+"""
+Hot reload of the course catalog.
+Polls courses.json for a new size/mtime (the scrapers and the GPA updater
+rewrite it in place), parses it on a background thread, diffs it against the
+loaded catalog by course id and hands only the added, changed and removed
+courses to a callback, which updates the live catalog and its derived indexes.
+
+The app's own writes of courses.json go through guard_write(): a newer file
+from a scraper is applied first, so the write keeps it, and the fingerprint of
+the app's own output is recorded so it is never reloaded as an outside change.
+Course changes the app has not saved yet win over the file's version of the
+same course on every reload.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+
+from write_behind import file_fingerprint
+
+def diff_catalog(current, new_courses):
+    """(added, changed, removed_ids) turning the current id -> course map into new_courses"""
+    added, changed = [], []
+    new_ids = set()
+    for course in new_courses:
+        course_id = course.get('id')
+        if course_id is None or course_id in new_ids:
+            continue
+        new_ids.add(course_id)
+        old = current.get(course_id)
+        if old is None:
+            added.append(course)
+        elif old != course:
+            changed.append(course)
+    removed_ids = [course_id for course_id in current if course_id not in new_ids]
+    return added, changed, removed_ids
+
+class CatalogWatcher:
+    """Background poller that applies catalog file changes through apply(added, changed, removed_ids)"""
+
+    def __init__(self, path, current, apply, interval=5.0, fingerprint=None, local_changes=None):
+        self.path = path
+        self.current = current    # () -> {course id: course} of the loaded catalog
+        self.apply = apply
+        self.interval = interval
+        self.local_changes = local_changes or dict  # () -> {course id: course} not yet saved by the app
+
+        # The file as the app loaded it, so a rewrite since then is still picked up
+        self._fingerprint = fingerprint if fingerprint is not None else self._stat()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.checks = 0
+        self.reloads = 0
+        self.errors = 0
+        self.last_reload = None
+
+    def _stat(self):
+        return file_fingerprint(self.path)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='catalog-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error reloading catalog: {e}")
+
+    def check(self):
+        """Reload the catalog if the file changed since the last successful check; returns the diff or None"""
+        with self._lock:
+            self.checks += 1
+            fingerprint = self._stat()
+            if fingerprint is None or fingerprint == self._fingerprint:
+                return None
+            return self._reload(fingerprint)
+
+    def guard_write(self, write):
+        """Run the app's write() of the file, first applying any newer version on disk.
+
+        Returns False without writing if that version cannot be read yet (e.g.
+        caught mid-write).
+        """
+        with self._lock:
+            fingerprint = self._stat()
+            if fingerprint is not None and fingerprint != self._fingerprint and self._reload(fingerprint) is None:
+                return False
+            write()
+            self._fingerprint = self._stat()
+            return True
+
+    def _reload(self, fingerprint):
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'r') as f:
+                new_courses = json.load(f)
+        except ValueError:
+            # Probably caught mid-write; the fingerprint is left alone so the next poll retries
+            return None
+        if self._stat() != fingerprint:
+            return None
+
+        # Unsaved local changes win over the file's version of a course (courses it dropped stay dropped)
+        local = self.local_changes()
+        if local:
+            new_courses = [local.get(course.get('id'), course) for course in new_courses]
+        added, changed, removed_ids = diff_catalog(self.current(), new_courses)
+        if added or changed or removed_ids:
+            self.apply(added, changed, removed_ids)
+            self.reloads += 1
+            self.last_reload = {
+                'timestamp': datetime.now().isoformat(),
+                'added': len(added),
+                'changed': len(changed),
+                'removed': len(removed_ids),
+                'seconds': round(time.perf_counter() - started, 4)
+            }
+            print(f"Reloaded catalog: {len(added)} added, {len(changed)} changed, {len(removed_ids)} removed")
+        self._fingerprint = fingerprint
+        return added, changed, removed_ids
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'checks': self.checks,
+            'reloads': self.reloads,
+            'errors': self.errors,
+            'lastReload': self.last_reload
+        }
@@ -0,0 +1,168 @@
+"""
+Circuit breakers for the Gemini client.
+Each call type gets a breaker that watches the error rate and latency of its
+recent calls. When too many fail or run slow the circuit opens and callers go
+straight to their rule-based fallback; after a cool-down one probe call is let
+through (half-open) to see whether Gemini has recovered. A probe that never
+reports back is given up on after `probe_timeout` seconds, so a lost probe
+cannot hold the circuit half-open.
+"""
+
+from collections import deque
+from datetime import datetime
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while its circuit is open"""
+
+class CircuitBreaker:
+    """Rolling-window breaker: slow calls count as failures"""
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5,
+                 slow_call_seconds=10.0, open_seconds=30.0, probe_timeout=None, on_state_change=None):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        # A probe slower than this would count as failed anyway
+        self.probe_timeout = probe_timeout if probe_timeout is not None else slow_call_seconds
+        self.on_state_change = on_state_change
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # (failed, latency)
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _transition(self, state, reason):
+        previous = self.state
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+        self._probe_in_flight = False
+        if self.on_state_change:
+            self.on_state_change(self.name, previous, state, reason)
+
+    def is_open(self):
+        """True while calls would be rejected (open and still cooling down)"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def allow(self):
+        """Whether a call may go to Gemini now; in half-open state only one probe at a time"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN, f'probing after {self.open_seconds}s open')
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight and time.monotonic() - self._probe_started < self.probe_timeout:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+            return True
+
+    def release(self):
+        """Give back an allowed call whose outcome is unknown (e.g. its client went away)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, failed, latency):
+        """Record the outcome of an allowed call"""
+        failed = failed or latency >= self.slow_call_seconds
+        with self._lock:
+            self.calls += 1
+            if failed:
+                self.failures += 1
+
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._transition(OPEN, f'probe failed after {latency:.1f}s')
+                else:
+                    self._transition(CLOSED, f'probe succeeded in {latency:.1f}s')
+                return
+
+            self._outcomes.append((failed, latency))
+            if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failure_count = sum(1 for f, _ in self._outcomes if f)
+                if failure_count / len(self._outcomes) >= self.failure_rate:
+                    self._transition(OPEN, f'{failure_count}/{len(self._outcomes)} recent calls failed or took over {self.slow_call_seconds}s')
+
+    def call(self, fn):
+        """Run fn through the breaker, raising CircuitOpenError if the circuit rejects it"""
+        if not self.allow():
+            raise CircuitOpenError(f'Gemini circuit for {self.name} is open')
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception:
+            self.record(True, time.monotonic() - started)
+            raise
+        self.record(False, time.monotonic() - started)
+        return result
+
+    def stats(self):
+        with self._lock:
+            latencies = [latency for _, latency in self._outcomes]
+            return {
+                'state': self.state,
+                'calls': self.calls,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'recentFailureRate': round(sum(1 for f, _ in self._outcomes if f) / len(self._outcomes), 3) if self._outcomes else None,
+                'recentAvgLatency': round(sum(latencies) / len(latencies), 3) if latencies else None
+            }
+
+class CircuitBreakerRegistry:
+    """One breaker per Gemini call type, plus a log of state changes for monitoring"""
+
+    def __init__(self, history=100, **breaker_options):
+        self.breaker_options = breaker_options
+        self.breakers = {}
+        self.transitions = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def get(self, call_type):
+        with self._lock:
+            breaker = self.breakers.get(call_type)
+            if breaker is None:
+                breaker = self.breakers[call_type] = CircuitBreaker(
+                    call_type, on_state_change=self._state_changed, **self.breaker_options
+                )
+            return breaker
+
+    def is_open(self, call_type):
+        return self.get(call_type).is_open()
+
+    def _state_changed(self, name, previous, state, reason):
+        print(f"Gemini circuit [{name}]: {previous} -> {state} ({reason})")
+        self.transitions.append({
+            'callType': name,
+            'from': previous,
+            'to': state,
+            'reason': reason,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {
+            'breakers': {name: breaker.stats() for name, breaker in breakers.items()},
+            'transitions': list(self.transitions)
+        }
@@ -0,0 +1,319 @@
+"""
+Inverted keyword index over the course catalog.
+Built once at startup and updated copy-on-write when a course changes, so the
+recommendation prefilter only has to score courses that share a term with the query.
+Query words match terms they are a substring of; those terms are found through
+an index of each term's short substrings (n-grams), so a lookup costs about as
+much as the terms it matches rather than a scan of the whole vocabulary.
+"""
+
+from collections import OrderedDict
+import re
+import threading
+
+TOKEN_PATTERN = re.compile(r'\w+')
+CONTAINING_TERMS_ENTRIES = 4096     # query tokens whose substring matches are cached (LRU)
+GRAM_LENGTH = 3     # terms are indexed under their substrings of up to this many characters
+SYLLABUS_SEARCH_CHARS = 2000  # Same slice of the syllabus that calculate_match_score searches
+
+def course_search_text(course):
+    """Build the lowercased (course_text, keyword_text) pair that query keywords are matched against"""
+    course_keywords = ' '.join(course.get('keywords', [])).lower()
+    course_text = (course.get('title', '') + ' ' + course.get('description', '')).lower()
+
+    if course.get('syllabus'):
+        course_text += ' ' + course.get('syllabus', '').lower()[:SYLLABUS_SEARCH_CHARS]
+    if course.get('syllabusTopics'):
+        course_text += ' ' + ' '.join(course.get('syllabusTopics', [])).lower()
+    if course.get('syllabusSkills'):
+        course_text += ' ' + ' '.join(course.get('syllabusSkills', [])).lower()
+
+    return course_text, course_keywords
+
+def term_grams(term):
+    """Every substring of term up to GRAM_LENGTH characters long"""
+    return {
+        term[start:start + size]
+        for size in range(1, GRAM_LENGTH + 1)
+        for start in range(len(term) - size + 1)
+    }
+
+class CourseSearchIndex:
+    """Posting lists from search terms and department codes to catalog slots.
+
+    Each course keeps the slot it was added at (its position in the catalog),
+    so results come back in catalog order and removed courses leave a hole
+    instead of shifting everyone else.
+    """
+
+    def __init__(self, courses=None):
+        self._courses = []          # slot -> course dict (None once removed)
+        self._slot_by_id = {}       # course id -> slot
+        self._texts = []            # slot -> (course_text, keyword_text)
+        self._terms = []            # slot -> set of terms posted for the course
+        self._departments = []      # slot -> lowercased department code
+        self._dept_postings = {}    # lowercased department code -> set of slots
+        # (term -> set of slots, n-gram -> set of terms containing it,
+        #  query token -> vocabulary terms containing it), swapped as one tuple
+        # so the n-grams and the substring cache always match their postings
+        self._vocabulary = ({}, {}, OrderedDict())
+        self._write_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+        # Built in place; only later changes go through copy-on-write
+        postings, gram_terms, _ = self._vocabulary
+        for course in courses or []:
+            if course['id'] in self._slot_by_id:
+                continue
+            slot = self._append_slot()
+            self._slot_by_id[course['id']] = slot
+            self._post(slot, course, postings, gram_terms, self._dept_postings)
+
+    def export_state(self):
+        """Plain containers (marshal-able) that from_state() rebuilds the index from"""
+        postings, gram_terms, _ = self._vocabulary
+        return {
+            'slot_by_id': self._slot_by_id,
+            'texts': self._texts,
+            'terms': self._terms,
+            'departments': self._departments,
+            'dept_postings': self._dept_postings,
+            'postings': postings,
+            'gram_terms': gram_terms
+        }
+
+    @classmethod
+    def from_state(cls, state, courses):
+        """Rebuild from export_state() output; courses are the records to put back in their slots"""
+        index = cls()
+        by_id = {course['id']: course for course in courses}
+        index._courses = [None] * len(state['texts'])
+        for course_id, slot in state['slot_by_id'].items():
+            index._courses[slot] = by_id[course_id]
+        index._slot_by_id = state['slot_by_id']
+        index._texts = state['texts']
+        index._terms = state['terms']
+        index._departments = state['departments']
+        index._dept_postings = state['dept_postings']
+        index._vocabulary = (state['postings'], state['gram_terms'], OrderedDict())
+        return index
+
+    def __len__(self):
+        return len(self._slot_by_id)
+
+    def slot_of(self, course_id):
+        """Return the catalog slot of a course id, or None if it is not indexed"""
+        return self._slot_by_id.get(course_id)
+
+    def course_at(self, slot):
+        return self._courses[slot]
+
+    def all_slots(self):
+        """Slots of every indexed course, in catalog order"""
+        return sorted(self._slot_by_id.values())
+
+    # Writers are serialized and never modify a dict or set a reader may be
+    # iterating: they copy it, change the copy and publish it with a single
+    # assignment, so searches run lock-free against a consistent version.
+
+    def add_course(self, course):
+        """Index a new course (or re-index an existing one) and return its slot"""
+        self.update_courses([course])
+        return self._slot_by_id[course['id']]
+
+    def update_course(self, course):
+        """Re-index a course after its searchable fields changed"""
+        return self.add_course(course)
+
+    def remove_course(self, course_id):
+        """Drop a course from the index, leaving its slot empty"""
+        slot = self._slot_by_id.get(course_id)
+        self.update_courses(removed_ids=[course_id])
+        return slot
+
+    def update_courses(self, courses=(), removed_ids=()):
+        """Add/re-index several courses and drop others, published as one new version"""
+        with self._write_lock:
+            published_postings, gram_terms, containing_terms = self._vocabulary
+            postings = dict(published_postings)
+            gram_terms = dict(gram_terms)
+            dept_postings = dict(self._dept_postings)
+            slot_by_id = dict(self._slot_by_id)
+
+            removed_slots = []
+            for course_id in removed_ids:
+                slot = slot_by_id.pop(course_id, None)
+                if slot is not None:
+                    self._unpost(slot, postings, gram_terms, dept_postings)
+                    removed_slots.append(slot)
+
+            new_terms = False
+            for course in courses:
+                slot = slot_by_id.get(course['id'])
+                if slot is None:
+                    slot = slot_by_id[course['id']] = self._append_slot()
+                else:
+                    self._unpost(slot, postings, gram_terms, dept_postings)
+                added = self._post(slot, course, postings, gram_terms, dept_postings, copy_on_write=True)
+                # Re-posting a course's own terms does not change the vocabulary
+                new_terms = new_terms or any(term not in published_postings for term in added)
+
+            # Cached substring lookups only ever miss terms that did not exist yet
+            self._dept_postings = dept_postings
+            self._vocabulary = (postings, gram_terms, OrderedDict() if new_terms else containing_terms)
+            self._slot_by_id = slot_by_id
+
+            # Only clear removed slots once no published version points at them
+            for slot in removed_slots:
+                self._courses[slot] = None
+                self._texts[slot] = ('', '')
+                self._terms[slot] = set()
+                self._departments[slot] = ''
+
+    def _append_slot(self):
+        slot = len(self._courses)
+        self._courses.append(None)
+        self._texts.append(('', ''))
+        self._terms.append(set())
+        self._departments.append('')
+        return slot
+
+    def _unpost(self, slot, postings, gram_terms, dept_postings):
+        """Take a slot out of (copied) postings, replacing the sets it was in"""
+        for term in self._terms[slot]:
+            remaining = postings.get(term, set()) - {slot}
+            if remaining:
+                postings[term] = remaining
+            elif postings.pop(term, None) is not None:
+                for gram in term_grams(term):
+                    remaining_terms = gram_terms.get(gram, set()) - {term}
+                    if remaining_terms:
+                        gram_terms[gram] = remaining_terms
+                    else:
+                        gram_terms.pop(gram, None)
+        department = self._departments[slot]
+        remaining = dept_postings.get(department, set()) - {slot}
+        if remaining:
+            dept_postings[department] = remaining
+        else:
+            dept_postings.pop(department, None)
+
+    def _post(self, slot, course, postings, gram_terms, dept_postings, copy_on_write=False):
+        """Index a course into the given postings; returns the terms it added to them.
+
+        With copy_on_write the posting and n-gram sets are replaced rather than
+        added to, since the dicts are copies still sharing their sets with readers.
+        """
+        course_text, keyword_text = course_search_text(course)
+        terms = set(TOKEN_PATTERN.findall(course_text)) | set(TOKEN_PATTERN.findall(keyword_text))
+        department = course.get('department', '').lower()
+
+        new_terms = []
+        for term in terms:
+            if term not in postings:
+                new_terms.append(term)
+                for gram in term_grams(term):
+                    if copy_on_write:
+                        gram_terms[gram] = gram_terms.get(gram, set()) | {term}
+                    else:
+                        gram_terms.setdefault(gram, set()).add(term)
+            if copy_on_write:
+                postings[term] = postings.get(term, set()) | {slot}
+            else:
+                postings.setdefault(term, set()).add(slot)
+        if copy_on_write:
+            dept_postings[department] = dept_postings.get(department, set()) | {slot}
+        else:
+            dept_postings.setdefault(department, set()).add(slot)
+
+        self._courses[slot] = course
+        self._texts[slot] = (course_text, keyword_text)
+        self._terms[slot] = terms
+        self._departments[slot] = department
+        return new_terms
+
+    def _token_slots(self, token):
+        postings, gram_terms, containing_terms = self._vocabulary
+        with self._cache_lock:
+            terms = containing_terms.get(token)
+            if terms is not None:
+                containing_terms.move_to_end(token)
+        if terms is None:
+            # All vocabulary terms that contain token as a substring: a short token
+            # is itself an n-gram; a longer one is in the terms sharing all of its
+            # n-grams (smallest set first), confirmed by a substring check
+            if len(token) <= GRAM_LENGTH:
+                terms = list(gram_terms.get(token, ()))
+            else:
+                grams = sorted(
+                    (gram_terms.get(token[start:start + GRAM_LENGTH], set())
+                     for start in range(len(token) - GRAM_LENGTH + 1)),
+                    key=len
+                )
+                terms = [term for term in grams[0].intersection(*grams[1:]) if token in term]
+            with self._cache_lock:
+                containing_terms[token] = terms
+                while len(containing_terms) > CONTAINING_TERMS_ENTRIES:
+                    containing_terms.popitem(last=False)
+        slots = set()
+        for term in terms:
+            slots |= postings.get(term, set())
+        return slots
+
+    def department_matches(self, keyword):
+        """Slots whose department matches keyword the way calculate_match_score checks it"""
+        kw_lower = keyword.lower()
+        slots = set()
+        for department, dept_slots in self._dept_postings.items():
+            if kw_lower == department or department.startswith(kw_lower) or kw_lower.startswith(department):
+                slots |= dept_slots
+        return slots
+
+    def text_matches(self, keyword):
+        """Slots whose title/description/keywords/syllabus text contains keyword"""
+        kw_lower = keyword.lower()
+        tokens = TOKEN_PATTERN.findall(kw_lower)
+
+        # A single-word keyword is a substring of the text exactly when it is a
+        # substring of one of the text's terms, so the postings are the answer
+        if len(tokens) == 1 and tokens[0] == kw_lower:
+            return self._token_slots(kw_lower)
+
+        # Phrases and punctuation: every word must appear inside some term, then
+        # confirm the surviving candidates against the stored text
+        if tokens:
+            candidates = None
+            for token in tokens:
+                token_slots = self._token_slots(token)
+                candidates = token_slots if candidates is None else candidates & token_slots
+                if not candidates:
+                    return set()
+        else:
+            candidates = self._slot_by_id.values()
+
+        return {
+            slot for slot in candidates
+            if kw_lower in self._texts[slot][0] or kw_lower in self._texts[slot][1]
+        }
+
+    def search_slots(self, query_keywords):
+        """Sorted slots of courses that share at least one term with the query.
+
+        Returns None when there are no keywords to search on, meaning every
+        course is a candidate.
+        """
+        if not query_keywords:
+            return None
+
+        slots = set()
+        for kw in query_keywords:
+            slots |= self.department_matches(kw)
+            slots |= self.text_matches(kw)
+        return sorted(slots)
+
+    def search(self, query_keywords):
+        """Courses (in catalog order) that share at least one term with the query, or None"""
+        slots = self.search_slots(query_keywords)
+        if slots is None:
+            return None
+        return [self._courses[slot] for slot in slots]
@@ -0,0 +1,254 @@
+"""
+Compact, read-only course records.
+A Course keeps the standard catalog fields in __slots__ instead of a per-course
+dict: strings are interned, departments, GenEd and career values are small
+integer ids into shared vocabularies, and schedules are packed arrays of
+(time, location) ids. Anything else (averageGPA, syllabus fields, ...) lives
+in a small overflow dict.
+
+Course implements the read-only Mapping interface, so course['title'],
+course.get('gened', []) and dict(course) work as they did with plain dicts
+(list fields come back as fresh lists). To change a course, copy it with
+dict(course), edit the copy and build a new record with Course.from_dict().
+"""
+
+from array import array
+from collections.abc import Mapping
+import sys
+import threading
+
+class Vocabulary:
+    """Interned strings <-> small integer ids, shared by every course"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+        self._lock = threading.Lock()
+
+    def id_of(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            with self._lock:
+                value_id = self.ids.get(value)
+                if value_id is None:
+                    value_id = len(self.values)
+                    self.values.append(sys.intern(value))
+                    self.ids[self.values[value_id]] = value_id
+        return value_id
+
+    def __len__(self):
+        return len(self.values)
+
+DEPARTMENTS = Vocabulary()
+GENED = Vocabulary()
+CAREERS = Vocabulary()
+SCHEDULE_STRINGS = Vocabulary()
+VOCABULARIES = {'department': DEPARTMENTS, 'gened': GENED, 'careerRelevance': CAREERS, 'schedule': SCHEDULE_STRINGS}
+
+MISSING = object()
+
+def _is_strings(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+# field -> (can_encode(value), encode, decode), in the catalog's own key order
+def _text():
+    return (lambda v: isinstance(v, str), lambda v: v, lambda v: v)
+
+def _interned():
+    return (lambda v: isinstance(v, str), sys.intern, lambda v: v)
+
+def _number():
+    return (lambda v: isinstance(v, (int, float)) and not isinstance(v, bool), lambda v: v, lambda v: v)
+
+def _strings():
+    return (_is_strings, lambda v: tuple(sys.intern(item) for item in v), list)
+
+def _vocabulary_id(vocabulary):
+    return (lambda v: isinstance(v, str), vocabulary.id_of, lambda v: vocabulary.values[v])
+
+def _vocabulary_ids(vocabulary):
+    return (
+        _is_strings,
+        lambda v: tuple(vocabulary.id_of(item) for item in v),
+        lambda v: [vocabulary.values[item] for item in v]
+    )
+
+def _can_pack_schedule(value):
+    return isinstance(value, list) and all(
+        isinstance(section, dict) and list(section) == ['time', 'location']
+        and isinstance(section['time'], str) and isinstance(section['location'], str)
+        for section in value
+    )
+
+def _pack_schedule(value):
+    if not value:
+        return ()
+    packed = array('I')
+    for section in value:
+        packed.append(SCHEDULE_STRINGS.id_of(section['time']))
+        packed.append(SCHEDULE_STRINGS.id_of(section['location']))
+    return packed
+
+def _unpack_schedule(packed):
+    strings = SCHEDULE_STRINGS.values
+    return [
+        {'time': strings[packed[i]], 'location': strings[packed[i + 1]]}
+        for i in range(0, len(packed), 2)
+    ]
+
+CODECS = {
+    'id': _interned(),
+    'title': _text(),
+    'department': _vocabulary_id(DEPARTMENTS),
+    'credits': _number(),
+    'prerequisites': _strings(),
+    'keywords': _strings(),
+    'description': _text(),
+    'typicalGrade': _interned(),
+    'difficulty': _number(),
+    'schedule': (_can_pack_schedule, _pack_schedule, _unpack_schedule),
+    'instructor': _interned(),
+    'gened': _vocabulary_ids(GENED),
+    'careerRelevance': _vocabulary_ids(CAREERS),
+}
+FIELDS = tuple(CODECS)
+DECODERS = {field: codec[2] for field, codec in CODECS.items()}
+
+class Course(Mapping):
+    """One catalog course; see the module docstring"""
+
+    __slots__ = FIELDS + ('_extra',)
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, Course):
+            return data
+        course = cls.__new__(cls)
+        extra = None
+        for field, (can_encode, encode, _) in CODECS.items():
+            value = data.get(field, MISSING)
+            if value is not MISSING and not can_encode(value):
+                # Unusual value for a standard field: keep it as-is in the overflow dict
+                extra = extra or {}
+                extra[field] = value
+                value = MISSING
+            elif value is not MISSING:
+                value = encode(value)
+            object.__setattr__(course, field, value)
+        for key, value in data.items():
+            if key not in CODECS:
+                extra = extra or {}
+                extra[key] = value
+        object.__setattr__(course, '_extra', extra)
+        return course
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Course records are read-only; build a new one with Course.from_dict()')
+
+    def __getitem__(self, key):
+        decode = DECODERS.get(key)
+        if decode is not None:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return decode(value)
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        decode = DECODERS.get(key)
+        if decode is not None:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return decode(value)
+        extra = self._extra
+        if extra is not None:
+            return extra.get(key, default)
+        return default
+
+    def __contains__(self, key):
+        if key in DECODERS and getattr(self, key) is not MISSING:
+            return True
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for field in FIELDS:
+            if getattr(self, field) is not MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+    def __repr__(self):
+        return f'Course({self.to_dict()!r})'
+
+_SETTERS = tuple(Course.__dict__[name].__set__ for name in Course.__slots__)
+_SCHEDULE = FIELDS.index('schedule')
+
+def _remap_ids(field, value, ids):
+    if field == 'department':
+        return ids[value]
+    if field == 'schedule':
+        return array('I', (ids[item] for item in value))
+    return tuple(ids[item] for item in value)
+
+def export_courses(courses):
+    """Marshal-able encoded records plus the vocabularies their ids refer to (for the catalog snapshot)"""
+    records = []
+    for course in courses:
+        values = [getattr(course, field) for field in FIELDS]
+        values = [None if value is MISSING else value for value in values]
+        if isinstance(values[_SCHEDULE], array):
+            values[_SCHEDULE] = values[_SCHEDULE].tobytes()
+        values.append(course._extra)
+        records.append(tuple(values))
+    return {
+        'vocabularies': {field: list(vocabulary.values) for field, vocabulary in VOCABULARIES.items()},
+        'records': records
+    }
+
+def import_courses(state):
+    """Course records from export_courses() output, without re-validating every field"""
+    # Ids line up with ours when the vocabularies were empty (or identical); remap otherwise
+    remaps = {}
+    for field, values in state['vocabularies'].items():
+        ids = [VOCABULARIES[field].id_of(value) for value in values]
+        if ids != list(range(len(ids))):
+            remaps[field] = ids
+
+    courses = []
+    new = Course.__new__
+    for values in state['records']:
+        course = new(Course)
+        for setter, value in zip(_SETTERS, values):
+            setter(course, MISSING if value is None else value)
+        schedule = values[_SCHEDULE]
+        if isinstance(schedule, bytes):
+            packed = array('I')
+            packed.frombytes(schedule)
+            _SETTERS[_SCHEDULE](course, packed)
+        if values[-1] is None:
+            _SETTERS[-1](course, None)
+        for field, ids in remaps.items():
+            value = getattr(course, field)
+            if value is not MISSING:
+                Course.__dict__[field].__set__(course, _remap_ids(field, value, ids))
+        courses.append(course)
+    return courses
+
+def to_courses(records):
+    """Convert a list of course dicts to Course records in place (keeping the list object)"""
+    records[:] = [Course.from_dict(record) for record in records]
+    return records
+
+def json_default(value):
+    """json.dump default= hook that serializes Course records as plain dicts"""
+    if isinstance(value, Course):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
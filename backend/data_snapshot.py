@@ -0,0 +1,143 @@
+"""
+Compiled snapshot of the loaded catalog.
+Stores the parsed catalog together with derived structures (search index
+postings, scoring feature arrays) so a worker can start without re-parsing and
+re-indexing the JSON. The file is a small JSON header followed by a marshal
+section for the records, with every repeated string interned so it is stored
+and loaded once, and raw NumPy sections that are memory-mapped rather than
+read, so forked workers share those pages.
+
+The header records the size and mtime of each source file, taken before the
+sources were read, and the Python version (the marshal format depends on it);
+the snapshot is ignored once any of them changes.
+"""
+
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+SNAPSHOT_VERSION = 7
+MAGIC = b'CMSNAP\0\0'
+HEADER_LENGTH = struct.Struct('<I')
+ALIGNMENT = 64
+
+def source_fingerprints(sources):
+    """[name, size, mtime] of each source file the snapshot was built from"""
+    fingerprints = []
+    for path in sources:
+        stat = os.stat(path)
+        fingerprints.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprints
+
+def intern_strings(value, _seen=None):
+    """Intern every string inside value in place so duplicates share one object"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return value
+    if isinstance(value, dict):
+        _seen.add(id(value))
+        items = [(sys.intern(k) if isinstance(k, str) else k, intern_strings(v, _seen)) for k, v in value.items()]
+        value.clear()
+        value.update(items)
+    elif isinstance(value, list):
+        _seen.add(id(value))
+        value[:] = [intern_strings(v, _seen) for v in value]
+    elif isinstance(value, set):
+        _seen.add(id(value))
+        items = [intern_strings(v, _seen) for v in value]
+        value.clear()
+        value.update(items)
+    elif isinstance(value, tuple):
+        return tuple(intern_strings(v, _seen) for v in value)
+    elif isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def python_version():
+    return list(sys.version_info[:2])
+
+def write_snapshot(path, fingerprints, payload, arrays=None):
+    """Atomically write payload (marshal-able records) plus named NumPy arrays as a snapshot.
+
+    fingerprints are source_fingerprints() of the sources from before they were
+    read, so a source rewritten while the payload was built makes the snapshot stale.
+    """
+    intern_strings(payload)
+    records = marshal.dumps(payload)
+    arrays = {name: np.ascontiguousarray(array) for name, array in (arrays or {}).items()}
+
+    # Section offsets are relative to the end of the header
+    layout = {'records': [0, len(records)], 'arrays': {}}
+    offset = len(records)
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout['arrays'][name] = [offset, array.dtype.str, list(array.shape)]
+        offset += array.nbytes
+
+    header = json.dumps({
+        'version': SNAPSHOT_VERSION,
+        'python': python_version(),
+        'sources': fingerprints,
+        'layout': layout
+    }).encode('utf-8')
+    # Pad the header so array sections stay aligned in the file too
+    prefix_length = len(MAGIC) + HEADER_LENGTH.size + len(header)
+    header += b' ' * (_aligned(prefix_length) - prefix_length)
+
+    # Per-process temp name: several workers may rebuild a stale snapshot at once
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(records)
+        written = len(records)
+        for name, array in arrays.items():
+            start = layout['arrays'][name][0]
+            f.write(b'\0' * (start - written))
+            f.write(array.tobytes())
+            written = start + array.nbytes
+    os.replace(tmp_path, path)
+
+def read_snapshot(path, sources):
+    """Return (payload, arrays) from the snapshot, or None if it is missing, unreadable or stale.
+
+    The arrays are read-only views into a memory map of the file.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (header_length,) = HEADER_LENGTH.unpack(f.read(HEADER_LENGTH.size))
+            header = json.loads(f.read(header_length))
+            if header.get('version') != SNAPSHOT_VERSION or header.get('python') != python_version():
+                return None
+            if header.get('sources') != source_fingerprints(sources):
+                print(f"Ignoring stale snapshot {path}: source data changed")
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        base = len(MAGIC) + HEADER_LENGTH.size + header_length
+        layout = header['layout']
+        offset, length = layout['records']
+        payload = marshal.loads(data[base + offset:base + offset + length])
+        arrays = {}
+        for name, (offset, dtype, shape) in layout['arrays'].items():
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape)) if shape else 1
+            arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=base + offset).reshape(shape)
+        return payload, arrays
+    except Exception as e:
+        print(f"Error reading snapshot {path}: {e}")
+        return None
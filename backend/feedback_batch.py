@@ -0,0 +1,109 @@
+"""
+Batch feedback ingestion.
+Clients buffer likes, dislikes and cart adds and send them in one request. Each
+event carries the client's timestamp and an idempotency key, so a batch that is
+retried after a lost response records nothing twice. Every event gets its own
+status; the valid new ones are recorded together with a single storage write.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
+
+from analytics import ACTION_COUNTERS
+
+FEEDBACK_ACTIONS = tuple(ACTION_COUNTERS)
+MAX_CLOCK_SKEW = timedelta(minutes=5)   # client clocks may run this far ahead
+MAX_EVENT_AGE = timedelta(days=7)       # oldest buffered event accepted
+MAX_KEY_LENGTH = 128
+
+def parse_client_timestamp(value):
+    """Local naive datetime of an ISO timestamp (a trailing Z or an offset is converted)"""
+    if not isinstance(value, str):
+        raise ValueError('timestamp must be an ISO 8601 string')
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def validate_event(event, default_student, course_exists, now):
+    """(feedback entry, None) for a valid event, or (None, error message)"""
+    if not isinstance(event, dict):
+        return None, 'event must be an object'
+    key = event.get('idempotencyKey')
+    if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+        return None, f'idempotencyKey must be a string of 1-{MAX_KEY_LENGTH} characters'
+    action = event.get('action')
+    if action not in FEEDBACK_ACTIONS:
+        return None, f"action must be one of: {', '.join(FEEDBACK_ACTIONS)}"
+    course_id = event.get('courseId')
+    if not isinstance(course_id, str) or not course_exists(course_id):
+        return None, 'unknown courseId'
+    student_id = event.get('studentId', default_student)
+    if not isinstance(student_id, str) or not student_id:
+        return None, 'studentId must be a string'
+    try:
+        timestamp = parse_client_timestamp(event.get('timestamp'))
+    except ValueError as error:
+        return None, f'invalid timestamp: {error}'
+    if timestamp > now + MAX_CLOCK_SKEW:
+        return None, 'timestamp is in the future'
+    if timestamp < now - MAX_EVENT_AGE:
+        return None, 'timestamp is too old'
+    return {
+        'courseId': course_id,
+        'action': action,
+        'studentId': student_id,
+        'timestamp': timestamp.isoformat(),
+        'receivedAt': now.isoformat(),
+        'idempotencyKey': key
+    }, None
+
+class IdempotencyKeys:
+    """Bounded record of the (student id, idempotency key) pairs already recorded; oldest forgotten first"""
+
+    def __init__(self, max_entries=100000, feedback=()):
+        self.max_entries = max_entries
+        self.duplicates = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        for entry in feedback:
+            key = entry.get('idempotencyKey')
+            if key:
+                self._remember((entry.get('studentId'), key))
+
+    def _remember(self, key):
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_entries:
+            self._keys.popitem(last=False)
+
+    def record_new(self, entries, record):
+        """Pass the entries whose keys are new (and first in the batch) to record(); returns their positions.
+
+        Checking and recording happen under one lock, so concurrent retries of a
+        batch cannot both get through. Keys are remembered only once record()
+        returns, so a failed write can be retried.
+        """
+        with self._lock:
+            seen = set()
+            positions = []
+            for position, entry in enumerate(entries):
+                key = (entry['studentId'], entry['idempotencyKey'])
+                if key in self._keys or key in seen:
+                    continue
+                seen.add(key)
+                positions.append(position)
+            self.duplicates += len(entries) - len(positions)
+            new_entries = [entries[position] for position in positions]
+            if new_entries:
+                record(new_entries)
+            for key in seen:
+                self._remember(key)
+            return positions
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._keys), 'maxKeys': self.max_entries, 'duplicates': self.duplicates}
@@ -0,0 +1,215 @@
+"""
+Append-only feedback journal.
+Each feedback event is appended as one JSON line to a journal next to the
+feedback.json snapshot instead of rewriting the whole file. fsyncs are batched
+(every N events or T seconds), and once the journal grows past a threshold it
+is compacted into the snapshot in the background. Startup replays snapshot plus
+journal.
+
+The journal starts with a header line recording how many events the snapshot
+held when the journal was started, so a crash between writing a new snapshot
+and resetting the journal never replays events twice.
+
+Compaction keeps appends cheap: under the lock it only renames the journal
+aside and starts a new one; the snapshot is written outside the lock, and the
+rotated journal is deleted once the new snapshot is in place. A crash in
+between leaves the rotated journal, which startup replays before the current one.
+"""
+
+import json
+import os
+import threading
+import time
+
+class FeedbackLog:
+    """Owns the in-memory feedback list and its snapshot + journal files"""
+
+    def __init__(self, snapshot_path, journal_path, fsync_every=32, fsync_interval=1.0, compact_every=10000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.rotated_path = journal_path + '.compacting'
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+
+        self.entries = []
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._journal = None
+        self._journal_entries = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._compact_requested = threading.Event()
+        self._closed = threading.Event()
+        self._worker = None
+        self.compactions = 0
+
+    def load(self):
+        """Replay snapshot plus journal into self.entries and open the journal for appends"""
+        entries = []
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                entries = json.load(f)
+
+        # A journal rotated by an interrupted compaction comes before the current one
+        interrupted = os.path.exists(self.rotated_path)
+        if interrupted:
+            base, journal_entries = self._read_journal(self.rotated_path, len(entries))
+            entries.extend(journal_entries[max(0, len(entries) - base):])
+
+        base, journal_entries = self._read_journal(self.journal_path, len(entries))
+        # Journal events already folded into the snapshot by an interrupted compaction
+        already_compacted = max(0, len(entries) - base)
+        entries.extend(journal_entries[already_compacted:])
+
+        with self._lock:
+            self.entries = entries
+            if interrupted:
+                # Finish the compaction so both journals can go
+                self._write_snapshot(entries)
+                self._reset_journal(len(entries))
+                os.remove(self.rotated_path)
+            elif already_compacted or not os.path.exists(self.journal_path):
+                self._reset_journal(len(entries))
+            else:
+                self._journal = open(self.journal_path, 'a')
+                self._journal_entries = len(journal_entries)
+                if self._journal.tell() and not self._ends_with_newline():
+                    # Terminate a torn line so the next append starts on its own line
+                    self._journal.write('\n')
+                    self._journal.flush()
+
+        self._worker = threading.Thread(target=self._run, name='feedback-log', daemon=True)
+        self._worker.start()
+        return self.entries
+
+    def _read_journal(self, path, base):
+        """(snapshot size the journal started from, its events); base is used if it has no header"""
+        records = []
+        if not os.path.exists(path):
+            return base, records
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; everything before it is intact
+                    print(f"Skipping unreadable feedback journal line {line_number + 1}")
+                    continue
+                if line_number == 0 and isinstance(record, dict) and '__journal_base__' in record:
+                    base = record['__journal_base__']
+                    continue
+                records.append(record)
+        return base, records
+
+    def _ends_with_newline(self):
+        with open(self.journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _reset_journal(self, base):
+        """Start an empty journal on top of a snapshot holding `base` events"""
+        if self._journal is not None:
+            self._journal.close()
+        # Per-process temp name: another process opening the same files must not move it away
+        tmp_path = f'{self.journal_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({'__journal_base__': base}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, 'a')
+        self._journal_entries = 0
+        self._unsynced = 0
+
+    def append(self, entry):
+        """Record one event in memory and in the journal"""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """Record several events with a single journal write"""
+        if not entries:
+            return
+        with self._lock:
+            self.entries.extend(entries)
+            self._journal.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+            self._journal.flush()
+            self._journal_entries += len(entries)
+            self._unsynced += len(entries)
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+            if self._journal_entries >= self.compact_every:
+                self._compact_requested.set()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """fsync any journal writes not yet on disk"""
+        with self._lock:
+            if self._journal is not None:
+                self._sync()
+
+    def _write_snapshot(self, entries):
+        tmp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def compact(self):
+        """Fold the journal into the snapshot and start a fresh journal"""
+        with self._compact_lock:
+            with self._lock:
+                if self._journal is None:
+                    return
+                self._sync()
+                self._journal.close()
+                self._journal = None
+                os.replace(self.journal_path, self.rotated_path)
+                count = len(self.entries)
+                self._reset_journal(count)
+            # self.entries only grows, so its first `count` events are exactly what the rotated journal covers
+            self._write_snapshot(self.entries[:count])
+            os.remove(self.rotated_path)
+            with self._lock:
+                self.compactions += 1
+
+    def _run(self):
+        while not self._closed.is_set():
+            if self._compact_requested.wait(self.fsync_interval):
+                self._compact_requested.clear()
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"Error compacting feedback journal: {e}")
+                continue
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error syncing feedback journal: {e}")
+
+    def close(self):
+        """Flush pending writes and stop the background thread"""
+        self._closed.set()
+        with self._lock:
+            if self._journal is not None:
+                self._sync()
+                self._journal.close()
+                self._journal = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'events': len(self.entries),
+                'journalEvents': self._journal_entries,
+                'unsyncedEvents': self._unsynced,
+                'compactions': self.compactions
+            }
@@ -0,0 +1,155 @@
+"""
+GenEd coverage planning.
+Finds a small set of courses that together cover every remaining GenEd
+requirement. Requirements are bits of a small int, so a course's coverage is
+one mask and the search is a set cover over masks:
+
+- candidates that overlap the cart in every section are dropped first, then
+  those another candidate can replace in any plan: a cheaper one (cost =
+  distance from the preferred difficulty) with the same coverage and meeting
+  times, or one without meeting times that covers at least as much for no more
+- a greedy pass (most new requirements per course, then cheapest) gives a
+  first plan to beat
+- branch and bound then always branches on the uncovered requirement with the
+  fewest candidates, and prunes when even the widest remaining courses cannot
+  finish with fewer courses (or equal courses at lower cost)
+
+Candidates must also fit the schedule: a course that overlaps the cart or an
+already planned course in every one of its sections is skipped. The search
+returns the best plan found once its time budget is spent.
+"""
+
+import time
+
+from schedule_model import course_meetings, required_mask
+
+class Candidate:
+    __slots__ = ('course', 'cover', 'cost', 'meetings', 'required')
+
+    def __init__(self, course, cover, cost):
+        self.course = course
+        self.cover = cover
+        self.cost = cost
+        self.meetings = tuple(sorted(set(course_meetings(course))))
+        self.required = required_mask(course)
+
+    def fits(self, busy):
+        """True unless every section overlaps busy (courses without parsed times always fit)"""
+        return not self.meetings or any(not mask & busy for mask in self.meetings)
+
+def bit_count(mask):
+    return bin(mask).count('1')
+
+def prune_candidates(candidates):
+    """Drop candidates that another fits in for wherever they fit, covering as much for no more"""
+    # Cheapest first, so whatever could replace a candidate has already been seen
+    ordered = sorted(candidates, key=lambda c: (c.cost, -bit_count(c.cover), c.course['id']))
+    distinct = {}
+    for candidate in ordered:
+        distinct.setdefault((candidate.cover, candidate.meetings), candidate)
+    timeless = []
+    for candidate in distinct.values():
+        if not candidate.meetings and not any(other.cover & candidate.cover == candidate.cover for other in timeless):
+            timeless.append(candidate)
+
+    cheapest_timeless = {}      # cover -> cost of the cheapest timeless candidate covering it, or None
+    pruned = list(timeless)
+    for candidate in distinct.values():
+        if not candidate.meetings:
+            continue
+        cover = candidate.cover
+        if cover not in cheapest_timeless:
+            costs = [other.cost for other in timeless if other.cover & cover == cover]
+            cheapest_timeless[cover] = min(costs) if costs else None
+        if cheapest_timeless[cover] is None or cheapest_timeless[cover] > candidate.cost:
+            pruned.append(candidate)
+    return pruned
+
+class GenEdPlanner:
+    """One planning run: cover the `full` requirement mask with candidates"""
+
+    def __init__(self, candidates, full, busy_mask=0, time_budget=0.2, check_every=256):
+        # Only candidates that fit around the cart are compared, so pruning never keeps a clashing course over one that fits
+        self.candidates = prune_candidates([c for c in candidates if c.cover & full and c.fits(busy_mask)])
+        self.full = full
+        self.busy_mask = busy_mask
+        self.time_budget = time_budget
+        self.check_every = check_every
+        # Requirements nobody can cover are left out of the target
+        self.coverable = 0
+        for candidate in self.candidates:
+            self.coverable |= candidate.cover & full
+        self.widest = max((bit_count(c.cover & full) for c in self.candidates), default=1)
+
+        self.best = None        # (requirements left uncovered, count, cost, [candidates])
+        self.nodes = 0
+        self.complete = True
+        self._deadline = None
+
+    def run(self):
+        started = time.perf_counter()
+        self._deadline = started + self.time_budget
+        self._greedy()
+        if self.coverable:
+            self._search(0, self.busy_mask, 0, [])
+        self.elapsed = time.perf_counter() - started
+        return self.best[3] if self.best else []
+
+    def _fits(self, candidate, busy):
+        return not busy or candidate.fits(busy)
+
+    def _offer(self, chosen, covered, cost):
+        key = (bit_count(self.coverable & ~covered), len(chosen), cost)
+        if self.best is None or key < self.best[:3]:
+            self.best = key + (list(chosen),)
+
+    def _greedy(self):
+        covered, busy, cost, chosen = 0, self.busy_mask, 0, []
+        while covered & self.coverable != self.coverable:
+            options = [c for c in self.candidates if c.cover & ~covered & self.coverable and self._fits(c, busy)]
+            if not options:
+                break
+            pick = max(options, key=lambda c: (bit_count(c.cover & ~covered & self.coverable), -c.cost))
+            chosen.append(pick)
+            covered |= pick.cover
+            busy |= pick.required
+            cost += pick.cost
+        # Kept even if the schedule left something uncovered, in case the search finds nothing better
+        self._offer(chosen, covered, cost)
+
+    def _out_of_time(self):
+        self.nodes += 1
+        if self.nodes % self.check_every == 0 and time.perf_counter() > self._deadline:
+            self.complete = False
+        return not self.complete
+
+    def _search(self, covered, busy, cost, chosen):
+        if self._out_of_time():
+            return
+        uncovered = self.coverable & ~covered
+        if not uncovered:
+            self._offer(chosen, covered, cost)
+            return
+        # Fewest courses this branch can still finish with
+        needed = len(chosen) + -(-bit_count(uncovered) // self.widest)
+        if self.best is not None and (0, needed, cost) >= self.best[:3]:
+            return
+
+        # Branch on the requirement with the fewest schedulable candidates
+        branch = None
+        requirement = uncovered
+        while requirement:
+            bit = requirement & -requirement
+            requirement ^= bit
+            options = [c for c in self.candidates if c.cover & bit and self._fits(c, busy)]
+            if not options:
+                return
+            if branch is None or len(options) < len(branch):
+                branch = options
+        branch.sort(key=lambda c: (-bit_count(c.cover & uncovered), c.cost))
+        for candidate in branch:
+            chosen.append(candidate)
+            self._search(covered | candidate.cover, busy | candidate.required, cost + candidate.cost, chosen)
+            chosen.pop()
+            if not self.complete:
+                return
@@ -0,0 +1,89 @@
+"""
+Memoization of Gemini query-intent extraction.
+Students ask a small set of phrasings, so intents are remembered under a
+normalized form of the query plus a fingerprint of only the profile fields
+the intent prompt uses. Changing any of those fields retires the old entries.
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import re
+import threading
+
+# Profile fields that appear in the intent extraction prompt
+INTENT_PROFILE_FIELDS = ('major', 'minor', 'careerGoals', 'interests', 'completedCourses')
+
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'in', 'on', 'at', 'to', 'for', 'with', 'that', 'this',
+    'i', 'me', 'my', 'im', 'want', 'need', 'looking', 'some', 'any', 'is', 'are', 'be',
+    'can', 'could', 'would', 'please', 'show', 'find', 'give', 'get', 'class', 'classes',
+    'course', 'courses', 'like', 'id', 'what', 'which'
+}
+
+def normalize_query(query):
+    """Lowercase, strip punctuation, collapse whitespace and drop stopwords"""
+    words = re.findall(r'[a-z0-9.+#-]+', query.lower().replace("'", ''))
+    words = [w.strip('.-') for w in words]
+    return ' '.join(w for w in words if w and w not in STOPWORDS)
+
+def profile_fingerprint(student_profile):
+    """Hash of the profile fields the intent prompt depends on"""
+    fields = [student_profile.get(field, []) for field in INTENT_PROFILE_FIELDS]
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+class QueryIntentMemo:
+    """LRU of extracted intents keyed by (profile fingerprint, normalized query)"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (fingerprint, normalized query) -> intent
+        self._by_fingerprint = {}      # fingerprint -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, query, student_profile):
+        key = (profile_fingerprint(student_profile), normalize_query(query))
+        with self._lock:
+            intent = self._entries.get(key)
+            if intent is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(intent)
+
+    def put(self, query, student_profile, intent):
+        fingerprint = profile_fingerprint(student_profile)
+        key = (fingerprint, normalize_query(query))
+        with self._lock:
+            self._entries[key] = copy.deepcopy(intent)
+            self._entries.move_to_end(key)
+            self._by_fingerprint.setdefault(fingerprint, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+
+    def _forget(self, key):
+        keys = self._by_fingerprint.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_fingerprint[key[0]]
+
+    def profile_updated(self, old_profile, new_profile):
+        """Drop intents memoized for the old profile if a field the prompt uses changed"""
+        if old_profile is None:
+            return
+        old_fingerprint = profile_fingerprint(old_profile)
+        if old_fingerprint == profile_fingerprint(new_profile):
+            return
+        with self._lock:
+            for key in self._by_fingerprint.pop(old_fingerprint, set()):
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache for Gemini responses.
+Responses are keyed by a hash of the model name plus the exact prompt and kept
+in two tiers: an in-memory LRU for hot entries and a SQLite file so the cache
+survives restarts. Each call type has its own TTL and both tiers are bounded.
+"""
+
+from collections import OrderedDict
+import hashlib
+import sqlite3
+import threading
+import time
+
+# Seconds a cached response stays valid, per call type
+DEFAULT_TTLS = {
+    'intent': 24 * 3600,
+    'score': 6 * 3600,
+    'rerank': 6 * 3600,
+    'explanation': 6 * 3600,
+    'syllabus_match': 3600,
+    'syllabus_extract': 7 * 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+def cache_key(model_name, prompt):
+    """Hash of model name plus prompt identifying a cached response"""
+    digest = hashlib.sha256()
+    digest.update((model_name or '').encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(prompt.encode('utf-8'))
+    return digest.hexdigest()
+
+class LLMCache:
+    """Two-tier (memory LRU + SQLite) response cache with per-call-type TTLs"""
+
+    def __init__(self, path=None, memory_entries=512, disk_entries=20000, ttls=None):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+
+        self._memory = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._counters = {}           # call type -> {'memory_hits', 'disk_hits', 'misses', 'stores'}
+        self._disk_writes = 0
+
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        call_type TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                self._db.execute('CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)')
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: LLM cache database unavailable ({e}); caching in memory only")
+                self._db = None
+
+    def _count(self, call_type, counter):
+        counters = self._counters.setdefault(call_type, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0})
+        counters[counter] += 1
+
+    def _remember(self, key, expires_at, response):
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, call_type, model_name, prompt):
+        """Cached response text for this prompt, or None"""
+        key = cache_key(model_name, prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._count(call_type, 'memory_hits')
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        'SELECT response, expires_at FROM llm_cache WHERE key = ?', (key,)
+                    ).fetchone()
+                    if row is not None and row[1] > now:
+                        self._db.execute('UPDATE llm_cache SET accessed_at = ? WHERE key = ?', (now, key))
+                        self._db.commit()
+                        self._remember(key, row[1], row[0])
+                        self._count(call_type, 'disk_hits')
+                        return row[0]
+                except sqlite3.Error as e:
+                    print(f"Error reading LLM cache: {e}")
+
+            self._count(call_type, 'misses')
+            return None
+
+    def put(self, call_type, model_name, prompt, response):
+        """Store a response under this prompt for the call type's TTL"""
+        key = cache_key(model_name, prompt)
+        now = time.time()
+        expires_at = now + self.ttls.get(call_type, DEFAULT_TTL)
+        with self._lock:
+            self._remember(key, expires_at, response)
+            self._count(call_type, 'stores')
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO llm_cache (key, call_type, response, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                    (key, call_type, response, expires_at, now)
+                )
+                self._disk_writes += 1
+                # Trim the file every so often rather than on every write
+                if self._disk_writes % 100 == 0:
+                    self._evict(now)
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing LLM cache: {e}")
+
+    def discard(self, model_name, prompt):
+        """Forget a cached response (e.g. one that turned out to be unusable)"""
+        key = cache_key(model_name, prompt)
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                try:
+                    self._db.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing LLM cache: {e}")
+
+    def _evict(self, now):
+        """Drop expired rows, then least recently used rows beyond disk_entries"""
+        self._db.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (now,))
+        count = self._db.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        if count > self.disk_entries:
+            self._db.execute(
+                'DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)',
+                (count - self.disk_entries,)
+            )
+
+    def stats(self):
+        """Hit/miss counters per call type plus current tier sizes"""
+        with self._lock:
+            by_type = {call_type: dict(counters) for call_type, counters in self._counters.items()}
+            disk_size = None
+            if self._db is not None:
+                try:
+                    disk_size = self._db.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            memory_size = len(self._memory)
+
+        hits = sum(c['memory_hits'] + c['disk_hits'] for c in by_type.values())
+        misses = sum(c['misses'] for c in by_type.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hitRate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'memoryEntries': memory_size,
+            'diskEntries': disk_size,
+            'byCallType': by_type
+        }
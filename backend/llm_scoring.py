@@ -0,0 +1,83 @@
+"""
+Concurrent LLM scoring of recommendation candidates.
+Fans candidate scoring out over a bounded worker pool and enforces one total
+deadline per request; candidates the model has not scored by then (or that
+failed) get their rule-based score instead.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+import time
+
+class CandidateScorer:
+    """Bounded worker pool shared by all requests"""
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-scoring')
+
+    def score_all(self, candidates, llm_score, fallback_score, deadline):
+        """Score every candidate, preferring llm_score when it finishes before the deadline.
+
+        llm_score(course) and fallback_score(course) both return (score, reasons);
+        llm_score may raise. Returns a list of (score, reasons, llm_scored) in
+        candidate order.
+        """
+        results = [None] * len(candidates)
+        for i, score, reasons, llm_scored in self.iter_scores(candidates, llm_score, fallback_score, deadline):
+            results[i] = (score, reasons, llm_scored)
+        return results
+
+    def iter_scores(self, candidates, llm_score, fallback_score, deadline):
+        """Yield (candidate index, score, reasons, llm_scored) as each candidate's score is known.
+
+        LLM scores arrive in completion order; failed candidates are yielded with
+        their fallback score straight away and timed-out ones after the deadline.
+        """
+        started = time.monotonic()
+        futures = {self.executor.submit(llm_score, course): i for i, course in enumerate(candidates)}
+        pending = set(futures)
+        llm_scored = 0
+        try:
+            try:
+                for future in as_completed(futures, timeout=max(0, deadline)):
+                    pending.discard(future)
+                    i = futures[future]
+                    if future.exception() is None:
+                        score, reasons = future.result()
+                        llm_scored += 1
+                        yield i, score, reasons, True
+                    else:
+                        print(f"Error calculating match score with Gemini: {future.exception()}")
+                        score, reasons = fallback_score(candidates[i])
+                        yield i, score, reasons, False
+            except FutureTimeoutError:
+                pass
+
+            timed_out = len(pending)
+            for future in sorted(pending, key=futures.get):
+                # Drop work that has not started yet; running calls finish in the background
+                future.cancel()
+                pending.discard(future)
+                i = futures[future]
+                score, reasons = fallback_score(candidates[i])
+                yield i, score, reasons, False
+
+            elapsed = time.monotonic() - started
+            print(f"Gemini scored {llm_scored}/{len(candidates)} candidates in {elapsed:.2f}s"
+                  + (f" ({timed_out} past the {deadline}s deadline)" if timed_out else ""))
+        finally:
+            # The consumer may stop early (e.g. a disconnected stream)
+            for future in pending:
+                future.cancel()
+
+    def call(self, fn, deadline):
+        """Run fn on the pool and return its result, raising TimeoutError past the deadline"""
+        future = self.executor.submit(fn)
+        try:
+            return future.result(timeout=max(0, deadline))
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
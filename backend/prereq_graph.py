@@ -0,0 +1,333 @@
+"""
+Compiled prerequisite graph.
+Catalog prerequisites are free text ("CS 1110/1111/1112/1120 with a C- or
+better", "Introductory math", "None"). A course's entries are alternatives
+("Passed place-out exam (CS 1110)", "CS 1110/1111/1112/1120 ..."), so the
+course codes they name together form one clause, satisfied by any of them.
+Entries without a course code are not checked. The graph still keeps a list of
+clauses per course, all of which must be met.
+
+Course codes are bits of Python int bitsets. Each code keeps the transitive
+closure of the courses it definitely requires (clauses naming a single course),
+so a student who completed CS2150 also counts as having its prerequisites. The
+clauses of the whole catalog are kept as one uint64 matrix, so eligibility for
+every course is a few NumPy operations.
+
+The graph is rebuilt copy-on-write: an update recomputes the closures of the
+changed courses and of everything that depends on them, then publishes a new
+state, so readers never take a lock.
+"""
+
+from functools import lru_cache
+import re
+import threading
+
+import numpy as np
+
+COURSE_CODE = re.compile(r'\b([A-Z]{2,4})\s*(\d{4}(?:\s*/\s*\d{4})*)\b')
+WORD_BITS = 64
+IMPLIED_CACHE_ENTRIES = 256
+
+@lru_cache(maxsize=8192)
+def course_codes(text):
+    """Course codes named in a prerequisite entry, e.g. "CS 1110/1111" -> ('CS1110', 'CS1111')"""
+    codes = []
+    for department, numbers in COURSE_CODE.findall(text.upper()):
+        for number in re.findall(r'\d{4}', numbers):
+            code = department + number
+            if code not in codes:
+                codes.append(code)
+    return tuple(codes)
+
+def parse_prerequisites(prerequisites):
+    """Clauses (tuples of alternative course codes) from a course's prerequisite entries.
+
+    The entries are alternatives, so this is one clause of every code they name
+    (or none if they name no course).
+    """
+    codes = []
+    for entry in prerequisites or []:
+        for code in course_codes(entry) if isinstance(entry, str) else ():
+            if code not in codes:
+                codes.append(code)
+    return [tuple(codes)] if codes else []
+
+class GraphState:
+    """One consistent version of the graph"""
+
+    def __init__(self):
+        self.bits = {}              # course code -> bit
+        self.codes = []             # bit -> course code
+        self.clauses = {}           # course id -> tuple of clauses (tuples of codes)
+        self.clause_masks = {}      # course id -> tuple of clause bitsets
+        self.dependents = {}        # course code -> set of course ids naming it
+        self.closure = {}           # course code -> bitset of courses it transitively requires
+        self.slots = {}             # course id -> catalog slot (for the clause matrix)
+        self.clause_matrix = np.zeros((0, 1), dtype=np.uint64)
+        self.clause_slot = np.zeros(0, dtype=np.int64)
+        self.implied_cache = {}
+
+    def copy(self):
+        state = GraphState()
+        state.bits = dict(self.bits)
+        state.codes = list(self.codes)
+        state.clauses = dict(self.clauses)
+        state.clause_masks = dict(self.clause_masks)
+        state.dependents = {code: set(ids) for code, ids in self.dependents.items()}
+        state.closure = dict(self.closure)
+        state.slots = dict(self.slots)
+        return state
+
+    def bit(self, code):
+        bit = self.bits.get(code)
+        if bit is None:
+            bit = self.bits[code] = len(self.codes)
+            self.codes.append(code)
+        return bit
+
+    def words(self):
+        return max(1, (len(self.codes) + WORD_BITS - 1) // WORD_BITS)
+
+    def to_words(self, mask):
+        words = self.words()
+        return np.frombuffer(mask.to_bytes(words * 8, 'little'), dtype='<u8').astype(np.uint64)
+
+class PrerequisiteGraph:
+    """Prerequisite clauses and closures of the catalog, laid out by CourseSearchIndex slot"""
+
+    def __init__(self, index):
+        self.index = index
+        self._write_lock = threading.Lock()
+        state = GraphState()
+        courses = [index.course_at(slot) for slot in index.all_slots()]
+        for course in courses:
+            self._set_clauses(state, course)
+        self._close(state, list(state.clauses))
+        self._compile(state)
+        self.state = state
+
+    def _set_clauses(self, state, course):
+        course_id = course['id']
+        state.slots[course_id] = self.index.slot_of(course_id)
+        for clause in state.clauses.get(course_id, ()):
+            for code in clause:
+                state.dependents[code].discard(course_id)
+        clauses = tuple(parse_prerequisites(course.get('prerequisites', [])))
+        state.clauses[course_id] = clauses
+        masks = []
+        for clause in clauses:
+            mask = 0
+            for code in clause:
+                mask |= 1 << state.bit(code)
+                state.dependents.setdefault(code, set()).add(course_id)
+            masks.append(mask)
+        state.clause_masks[course_id] = tuple(masks)
+        state.bit(course_id)
+
+    def _remove(self, state, course_id):
+        for clause in state.clauses.pop(course_id, ()):
+            for code in clause:
+                state.dependents[code].discard(course_id)
+        state.clause_masks.pop(course_id, None)
+        state.slots.pop(course_id, None)
+
+    def _close(self, state, changed_ids):
+        """Recompute the closures of changed_ids and of every course depending on them"""
+        stale = set()
+        pending = list(changed_ids)
+        while pending:
+            code = pending.pop()
+            if code in stale:
+                continue
+            stale.add(code)
+            pending.extend(state.dependents.get(code, ()))
+        for code in stale:
+            state.closure.pop(code, None)
+
+        def closure_of(code, stack):
+            """(closure of code, without code itself; shallowest stack position relied on).
+
+            As in _steps, a closure that relied on a course still on the stack
+            is missing part of its cycle, so only the others are kept.
+            """
+            closure = state.closure.get(code)
+            if closure is not None:
+                return closure, len(stack)
+            depth = stack[code] = len(stack)
+            closure = 0
+            low = depth
+            for clause in state.clauses.get(code, ()):
+                if len(clause) != 1:
+                    continue
+                required = clause[0]
+                position = stack.get(required)
+                if position is not None:
+                    low = min(low, position)
+                    continue
+                required_closure, required_low = closure_of(required, stack)
+                low = min(low, required_low)
+                closure |= (1 << state.bits[required]) | required_closure
+            del stack[code]
+            closure &= ~(1 << state.bits[code])
+            if low >= depth:
+                state.closure[code] = closure
+            return closure, low
+
+        for code in stale:
+            closure_of(code, {})
+
+    def _compile(self, state):
+        """Flatten every clause into the matrix used by the vectorized check"""
+        rows = [(state.slots[course_id], mask)
+                for course_id, masks in state.clause_masks.items()
+                if state.slots.get(course_id) is not None
+                for mask in masks]
+        words = state.words()
+        state.clause_matrix = np.zeros((len(rows), words), dtype=np.uint64)
+        state.clause_slot = np.zeros(len(rows), dtype=np.int64)
+        for row, (slot, mask) in enumerate(rows):
+            state.clause_matrix[row] = state.to_words(mask)
+            state.clause_slot[row] = slot
+
+    def update_courses(self, courses=(), removed_ids=()):
+        """Recompute clauses and closures after courses were added, changed or removed in the index"""
+        with self._write_lock:
+            state = self.state.copy()
+            for course_id in removed_ids:
+                self._remove(state, course_id)
+            for course in courses:
+                self._set_clauses(state, course)
+            self._close(state, [course['id'] for course in courses] + list(removed_ids))
+            self._compile(state)
+            self.state = state
+
+    def implied_mask(self, completed, state=None):
+        """Bitset of the completed courses plus everything they transitively required"""
+        state = state or self.state
+        key = frozenset(entry for entry in completed if isinstance(entry, str))
+        mask = state.implied_cache.get(key)
+        if mask is None:
+            mask = 0
+            for entry in key:
+                for code in course_codes(entry):
+                    bit = state.bits.get(code)
+                    if bit is not None:
+                        mask |= (1 << bit) | state.closure.get(code, 0)
+            if len(state.implied_cache) >= IMPLIED_CACHE_ENTRIES:
+                state.implied_cache.clear()
+            state.implied_cache[key] = mask
+        return mask
+
+    def implied_codes(self, completed):
+        """Set of course codes implied by the completed courses"""
+        state = self.state
+        mask = self.implied_mask(completed, state)
+        codes = set()
+        while mask:
+            low = mask & -mask
+            codes.add(state.codes[low.bit_length() - 1])
+            mask ^= low
+        return codes
+
+    def slot_status(self, completed, rows):
+        """(all_met, some_met) boolean arrays by slot: no clause unmet / at least one clause met"""
+        state = self.state
+        if not len(state.clause_slot):
+            return np.ones(rows, dtype=bool), np.zeros(rows, dtype=bool)
+        implied = state.to_words(self.implied_mask(completed, state))
+        met = np.any(state.clause_matrix & implied, axis=1)
+        length = max(rows, int(state.clause_slot.max()) + 1)
+        unmet_count = np.bincount(state.clause_slot[~met], minlength=length)[:rows]
+        met_count = np.bincount(state.clause_slot[met], minlength=length)[:rows]
+        return unmet_count == 0, met_count > 0
+
+    def is_eligible(self, course_id, completed):
+        """True if every prerequisite clause of the course is met"""
+        state = self.state
+        implied = self.implied_mask(completed, state)
+        return all(mask & implied for mask in state.clause_masks.get(course_id, ()))
+
+    def missing(self, course_id, completed):
+        """Unmet clauses of a course, each as a list of alternative course codes"""
+        state = self.state
+        implied = self.implied_mask(completed, state)
+        return [
+            list(clause)
+            for clause, mask in zip(state.clauses.get(course_id, ()), state.clause_masks.get(course_id, ()))
+            if not mask & implied
+        ]
+
+    def _steps(self, state, implied, code, steps, stack):
+        """(terms of prerequisites before code can be taken or None, shallowest stack position relied on).
+
+        A path back into a course still on the stack is a cycle and cannot help.
+        Answers that relied on such a course (other than themselves) depend on
+        how they were reached, so only the others are kept in steps.
+        """
+        if code in steps:
+            return steps[code], len(stack)
+        position = stack.get(code)
+        if position is not None:
+            return None, position
+        depth = stack[code] = len(stack)
+        needed = 0
+        low = depth
+        for clause, mask in zip(state.clauses.get(code, ()), state.clause_masks.get(code, ())):
+            if mask & implied:
+                continue
+            options = []
+            for alternative in clause:
+                option, option_low = self._steps(state, implied, alternative, steps, stack)
+                low = min(low, option_low)
+                if option is not None:
+                    options.append(option + 1)
+            if not options:
+                needed = None
+                break
+            needed = max(needed, min(options))
+        del stack[code]
+        if low >= depth:
+            steps[code] = needed
+        return needed, low
+
+    def steps_away(self, completed):
+        """course id -> least number of terms of prerequisites still to take (0 = eligible now).
+
+        Courses caught in a prerequisite cycle they cannot leave are left out.
+        """
+        state = self.state
+        implied = self.implied_mask(completed, state)
+        steps = {}
+        for course_id in state.clauses:
+            self._steps(state, implied, course_id, steps, {})
+        return {course_id: steps[course_id] for course_id in state.clauses if steps[course_id] is not None}
+
+    def steps_of(self, course_id, completed):
+        """steps_away() for one course, visiting only its own prerequisites (None if it is unknown or stuck in a cycle)"""
+        state = self.state
+        if course_id not in state.clauses:
+            return None
+        return self._steps(state, self.implied_mask(completed, state), course_id, {}, {})[0]
+
+    def unlocks(self, completed):
+        """{course id eligible now: [course ids it would make eligible]} for courses not yet taken"""
+        state = self.state
+        implied = self.implied_mask(completed, state)
+
+        def eligible(course_id, mask):
+            return all(clause & mask for clause in state.clause_masks.get(course_id, ()))
+
+        unlocked = {}
+        for code, course_ids in state.dependents.items():
+            bit = state.bits[code]
+            if implied >> bit & 1 or code not in state.clause_masks or not eligible(code, implied):
+                continue
+            with_course = implied | (1 << bit) | state.closure.get(code, 0)
+            opened = sorted(
+                course_id for course_id in course_ids
+                if not implied >> state.bits[course_id] & 1
+                and not eligible(course_id, implied) and eligible(course_id, with_course)
+            )
+            if opened:
+                unlocked[code] = opened
+        return unlocked
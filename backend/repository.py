@@ -0,0 +1,127 @@
+"""
+In-memory repositories over the loaded data lists.
+Each repository wraps one of the module-level lists (COURSES, PROFESSORS,
+STUDENT_PROFILES) with an id -> position dict that is kept in sync on every
+mutation, so lookups no longer scan the whole list.
+
+Writers hold the repository's lock and replace records instead of editing them
+in place (copy, change the copy, upsert it), so readers never take a lock and
+always see either the old or the new version of a record.
+"""
+
+import re
+import threading
+
+HONORIFICS = re.compile(r'^(dr|prof|professor|mr|mrs|ms)\.?\s+')
+
+class Repository:
+    """A list of records with an id-keyed index; mutate only through these methods"""
+
+    def __init__(self, records, key='id'):
+        self.records = records
+        self.key = key
+        # Held by every mutation; take it around read-modify-write sequences too
+        self.lock = threading.RLock()
+        self._positions = {}
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the id index (after the list was replaced or reordered wholesale)"""
+        with self.lock:
+            self._positions = {record[self.key]: i for i, record in enumerate(self.records)}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __contains__(self, record_id):
+        return record_id in self._positions
+
+    def get(self, record_id, default=None):
+        position = self._positions.get(record_id)
+        if position is None:
+            return default
+        try:
+            record = self.records[position]
+        except IndexError:
+            record = None
+        if record is None or record[self.key] != record_id:
+            # Raced with a remove() shifting positions; look again once it is done
+            with self.lock:
+                position = self._positions.get(record_id)
+                return self.records[position] if position is not None else default
+        return record
+
+    def index_of(self, record_id):
+        return self._positions.get(record_id)
+
+    def upsert(self, record):
+        """Replace the record with the same id, or append it; returns its position"""
+        with self.lock:
+            position = self._positions.get(record[self.key])
+            if position is None:
+                position = len(self.records)
+                self.records.append(record)
+                self._positions[record[self.key]] = position
+            else:
+                self.records[position] = record
+            return position
+
+    def remove(self, record_id):
+        """Remove a record; positions after it shift down by one"""
+        removed = self.remove_many([record_id])
+        return removed[0] if removed else None
+
+    def remove_many(self, record_ids):
+        """Remove several records with a single reindex; returns the removed records"""
+        with self.lock:
+            doomed = {self._positions[record_id] for record_id in record_ids if record_id in self._positions}
+            if not doomed:
+                return []
+            removed = [self.records[position] for position in sorted(doomed)]
+            self.records[:] = [record for position, record in enumerate(self.records) if position not in doomed]
+            self._positions = {record[self.key]: i for i, record in enumerate(self.records)}
+            return removed
+
+def normalize_person_name(name):
+    """Lowercase, drop honorifics like "Dr." / "Prof." and collapse whitespace"""
+    name = ' '.join((name or '').lower().replace(',', ' ').split())
+    return HONORIFICS.sub('', name)
+
+class ProfessorRepository(Repository):
+    """Professors by id, plus a name index for course records that store the instructor's name"""
+
+    def reindex(self):
+        with self.lock:
+            super().reindex()
+            self._by_name = {}
+            for professor in self.records:
+                self._by_name.setdefault(normalize_person_name(professor.get('name')), professor)
+
+    def upsert(self, record):
+        with self.lock:
+            position = self._positions.get(record[self.key])
+            if position is not None:
+                old_name = normalize_person_name(self.records[position].get('name'))
+                if self._by_name.get(old_name) is self.records[position]:
+                    del self._by_name[old_name]
+            position = super().upsert(record)
+            self._by_name.setdefault(normalize_person_name(record.get('name')), record)
+            return position
+
+    def remove_many(self, record_ids):
+        with self.lock:
+            removed = super().remove_many(record_ids)
+            for record in removed:
+                name = normalize_person_name(record.get('name'))
+                if self._by_name.get(name) is record:
+                    del self._by_name[name]
+            return removed
+
+    def find(self, instructor):
+        """Professor for a course's instructor field, given either a professor id or a name"""
+        if not instructor:
+            return None
+        return self.get(instructor) or self._by_name.get(normalize_person_name(instructor))
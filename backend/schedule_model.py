@@ -0,0 +1,138 @@
+"""
+Parsed weekly schedules.
+Catalog schedules are free text such as "MW 2:00-3:15" with am/pm stripped by
+the Lou's List scraper. Each meeting is parsed once into a weekly bitmask of
+5-minute slots (7 days x 288 slots, bit = day * 288 + slot), recovering am/pm
+from the hour, so time-of-day preferences and cart conflicts become mask
+operations. Masks are Python ints here; mask_words() packs them into the
+uint64 words the vectorized scorer works with.
+"""
+
+from functools import lru_cache
+import re
+
+import numpy as np
+
+DAYS = 'MTWRFSU'                 # R = Thursday, S = Saturday, U = Sunday
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WEEK_SLOTS = len(DAYS) * SLOTS_PER_DAY
+MASK_WORDS = (WEEK_SLOTS + 63) // 64
+
+MEETING_PATTERN = re.compile(r'^\s*([MTWRFSU]+)\s+(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+# Named parts of the day as [start, end) minutes; they may overlap
+TIME_WINDOWS = {
+    'morning': (0, 12 * 60),
+    'mid-day': (11 * 60, 14 * 60),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 24 * 60),
+}
+TIME_WINDOW_ALIASES = {
+    'morning': 'morning', 'mornings': 'morning', 'am': 'morning',
+    'mid-day': 'mid-day', 'midday': 'mid-day', 'mid day': 'mid-day', 'noon': 'mid-day', 'lunchtime': 'mid-day',
+    'afternoon': 'afternoon', 'afternoons': 'afternoon', 'pm': 'afternoon',
+    'evening': 'evening', 'evenings': 'evening', 'night': 'evening', 'night class': 'evening',
+}
+
+def _minutes(hour, minute, after=None):
+    """Minutes since midnight for a clock time without am/pm.
+
+    Classes run from about 8am to 10pm, so 8-11 are mornings, 12 is noon and
+    1-7 are afternoons/evenings. An end time that would fall before its start
+    time (e.g. "5:00-9:00") is in the evening.
+    """
+    if 1 <= hour <= 7:
+        hour += 12
+    minutes = hour * 60 + minute
+    if after is not None and minutes <= after and hour < 12:
+        minutes += 12 * 60
+    return minutes
+
+@lru_cache(maxsize=4096)
+def parse_meeting(time_string):
+    """(days, start_minute, end_minute) for a schedule time like "MWF 10:00-10:50", or None"""
+    match = MEETING_PATTERN.match(time_string or '')
+    if not match:
+        return None
+    days, start_hour, start_minute, end_hour, end_minute = match.groups()
+    start = _minutes(int(start_hour), int(start_minute))
+    end = _minutes(int(end_hour), int(end_minute), after=start)
+    if end <= start or end > 24 * 60:
+        return None
+    return ''.join(day for day in DAYS if day in days), start, end
+
+def _day_range_mask(start, end):
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)   # a slot is busy if any part of it is
+    return ((1 << (last - first)) - 1) << first
+
+@lru_cache(maxsize=4096)
+def meeting_mask(time_string):
+    """Weekly slot mask of one meeting; 0 if the time could not be parsed"""
+    meeting = parse_meeting(time_string)
+    if meeting is None:
+        return 0
+    days, start, end = meeting
+    day_mask = _day_range_mask(start, end)
+    mask = 0
+    for day in days:
+        mask |= day_mask << (DAYS.index(day) * SLOTS_PER_DAY)
+    return mask
+
+def window_mask(start, end):
+    """Mask of [start, end) minutes on every day of the week"""
+    day_mask = _day_range_mask(start, end)
+    mask = 0
+    for day in range(len(DAYS)):
+        mask |= day_mask << (day * SLOTS_PER_DAY)
+    return mask
+
+def mask_words(mask):
+    """Pack a slot mask into MASK_WORDS little-endian uint64 words"""
+    return np.frombuffer(mask.to_bytes(MASK_WORDS * 8, 'little'), dtype='<u8').astype(np.uint64)
+
+def preferred_windows(student_profile, query_keywords=None):
+    """Time windows asked for in the query, else the ones in the profile's timePreferences"""
+    for values in (query_keywords or [], student_profile.get('timePreferences', [])):
+        windows = sorted({
+            TIME_WINDOW_ALIASES[value.strip().lower()]
+            for value in values
+            if isinstance(value, str) and value.strip().lower() in TIME_WINDOW_ALIASES
+        }, key=list(TIME_WINDOWS).index)
+        if windows:
+            return windows
+    return []
+
+def preference_mask(windows):
+    """Union of the named windows on every day; 0 for no preference"""
+    mask = 0
+    for window in windows:
+        mask |= window_mask(*TIME_WINDOWS[window])
+    return mask
+
+def course_meetings(course):
+    """Masks of a course's sections whose times could be parsed"""
+    masks = [meeting_mask(section.get('time', '')) for section in course.get('schedule', [])]
+    return [mask for mask in masks if mask]
+
+def fits_preferences(course, pref_mask):
+    """True if some section of the course lies entirely inside the preferred windows"""
+    return any(not (mask & ~pref_mask) for mask in course_meetings(course))
+
+def conflicts(course, busy_mask):
+    """True if every section of the course overlaps busy time (courses without parsed times never conflict)"""
+    meetings = course_meetings(course)
+    return bool(meetings) and all(mask & busy_mask for mask in meetings)
+
+def required_mask(course, section_time=None):
+    """Time a course occupies: the chosen section, or what every section has in common"""
+    if section_time:
+        return meeting_mask(section_time)
+    meetings = course_meetings(course)
+    if not meetings:
+        return 0
+    mask = meetings[0]
+    for other in meetings[1:]:
+        mask &= other
+    return mask
@@ -0,0 +1,149 @@
+"""
+Fixed-memory stream summaries for approximate analytics.
+- SpaceSaving: the heaviest keys of a stream with `capacity` counters; every
+  reported count is an overestimate by at most its recorded error (and at most
+  N / capacity overall).
+- CountMinSketch: per-key counters in depth x width cells; estimates never
+  undercount and overcount by at most e/width * N with probability 1 - e^-depth.
+- HyperLogLog: distinct-count estimate in 2^precision one-byte registers, with
+  a standard error of about 1.04 / sqrt(2^precision).
+
+Keys are hashed with blake2b, so sketches agree across processes and restarts.
+"""
+
+from functools import lru_cache
+import hashlib
+import heapq
+import math
+
+import numpy as np
+
+def hash64(value, salt=b''):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8, salt=salt).digest(), 'little')
+
+class SpaceSaving:
+    """Top-k heavy hitters (Metwally et al.) with per-key overestimation bounds"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}          # key -> [count, error]
+        self.total = 0
+        self._heap = []             # (count, key), possibly stale; the smallest live entry is the minimum
+
+    def add(self, key, count=1):
+        """Count key; returns the key it evicted to make room, if any"""
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+            self._push(counter[0], key)
+            return None
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+            self._push(count, key)
+            return None
+        # Take over the smallest counter; its count becomes the newcomer's error bound
+        evicted = self._pop_min()
+        floor = self.counters.pop(evicted)[0]
+        self.counters[key] = [floor + count, floor]
+        self._push(floor + count, key)
+        return evicted
+
+    def _push(self, count, key):
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.capacity:
+            # Drop stale entries
+            self._heap = [(counter[0], k) for k, counter in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            counter = self.counters.get(key)
+            if counter is not None and counter[0] == count:
+                return key
+
+    def top(self, k):
+        """[(key, count, error)] of the k largest counters"""
+        ranked = sorted(self.counters.items(), key=lambda item: -item[1][0])[:k]
+        return [(key, count, error) for key, (count, error) in ranked]
+
+    def max_error(self):
+        return self.total // self.capacity if self.capacity else self.total
+
+    def memory_bytes(self):
+        return self.capacity * 3 * 8
+
+class CountMinSketch:
+    """depth x width cells, each holding `fields` counters for the keys hashed into it"""
+
+    def __init__(self, width, depth, fields=1):
+        self.width = width
+        self.depth = depth
+        self.cells = np.zeros((depth, width, fields), dtype=np.int64)
+        self.total = 0
+        self._rows = np.arange(depth)
+
+    def _columns(self, key):
+        return _columns(key, self.width, self.depth)
+
+    def add_many(self, keys, values):
+        """Add one row of per-field counts (values[i]) for each of keys"""
+        if not keys:
+            return
+        columns = np.array([self._columns(key) for key in keys])          # (n, depth)
+        values = np.asarray(values, dtype=np.int64)                       # (n, fields)
+        for row in range(self.depth):
+            np.add.at(self.cells[row], columns[:, row], values)
+        self.total += len(keys)
+
+    def estimate(self, key):
+        """Per-field estimates for key (never below the true counts)"""
+        return self.cells[self._rows, self._columns(key)].min(axis=0)
+
+    def error_bound(self, count):
+        """(overcount bound for a stream of `count` additions per field, probability it holds)"""
+        return math.ceil(math.e / self.width * count), 1 - math.exp(-self.depth)
+
+    def memory_bytes(self):
+        return self.cells.nbytes
+
+@lru_cache(maxsize=16384)
+def _columns(key, width, depth):
+    # Double hashing: column i = h1 + i * h2
+    digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return tuple((h1 + i * h2) % width for i in range(depth))
+
+class HyperLogLog:
+    """Distinct-count estimator (Flajolet et al.) with small-range correction"""
+
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        self.add_hash(hash64(value, b'hll'))
+
+    def add_hash(self, hashed):
+        """Add a value already hashed with hash64(value, b'hll')"""
+        index = hashed >> (64 - self.precision)
+        rest = (hashed << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def standard_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def memory_bytes(self):
+        return len(self.registers)
@@ -0,0 +1,342 @@
+"""
+Storage backends for courses, professors, student profiles and feedback.
+The app keeps its data in memory and calls the backend to load it at startup
+and to persist each change. JsonStorage keeps the original data/*.json files;
+SQLiteStorage keeps everything in one SQLite database with row-level updates,
+so saving one course no longer rewrites the whole catalog. Both are persistence
+only: each process reads its data once at startup, so changes made by one
+worker process are not seen by another until it restarts.
+
+Import the JSON data into a new database with:
+    python storage.py [data_dir] [database_path]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from feedback_log import FeedbackLog
+from write_behind import WriteBehindFlusher, atomic_write_json, file_fingerprint
+from course_model import json_default
+
+class ExternalChangeError(Exception):
+    """A file changed on disk under unsaved changes and could not be merged yet"""
+
+class JsonStorage:
+    """The data/*.json files; changed files are rewritten whole by a write-behind flusher.
+
+    Files that other processes also rewrite (courses.json) are written through
+    a guard registered with watch_external(), which folds a newer file into
+    memory before the write instead of letting the write replace it.
+    """
+
+    name = 'json'
+
+    def __init__(self, data_dir, feedback_log, flush_interval=2.0, flush_max_pending=50):
+        self.data_dir = data_dir
+        self.feedback_log = feedback_log
+        self._loaded = {}
+        self._fingerprints = {}     # filename -> file fingerprint when loaded
+        self._guards = {}           # filename -> guard(write) for files others may rewrite
+        self._unsaved_courses = {}  # course id -> course changed since courses.json was last written
+        self._unsaved_lock = threading.Lock()
+        self.flusher = WriteBehindFlusher(self._dump, interval=flush_interval, max_pending=flush_max_pending)
+
+    def _path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def _load(self, filename):
+        # Taken before reading, so a rewrite during the read still counts as a change
+        self._fingerprints[filename] = file_fingerprint(self._path(filename))
+        with open(self._path(filename), 'r') as f:
+            self._loaded[filename] = json.load(f)
+        return self._loaded[filename]
+
+    def loaded_fingerprint(self, filename):
+        """Fingerprint of filename as it was when loaded (or adopted)"""
+        return self._fingerprints.get(filename)
+
+    def unsaved_courses(self):
+        """{course id: course} changed in memory but not yet written to courses.json"""
+        with self._unsaved_lock:
+            return dict(self._unsaved_courses)
+
+    def watch_external(self, filename, guard):
+        """Write filename only through guard(write), for files other processes rewrite too.
+
+        The guard folds a newer file on disk into memory, calls write() and
+        returns True, or returns False if the file cannot be read yet.
+        """
+        self._guards[filename] = guard
+
+    def _dump(self, filename):
+        path = self._path(filename)
+        unsaved = self.unsaved_courses() if filename == 'courses.json' else {}
+
+        def write():
+            data = self._loaded[filename]
+            try:
+                # Serialize a shallow copy so concurrent appends don't disturb the dump
+                atomic_write_json(path, list(data), default=json_default)
+            except RuntimeError:
+                # A record changed size mid-dump; try once more
+                atomic_write_json(path, list(data), default=json_default)
+
+        guard = self._guards.get(filename)
+        if guard is None:
+            write()
+        elif not guard(write):
+            raise ExternalChangeError(f'{filename} changed on disk; writing after it can be merged')
+        with self._unsaved_lock:
+            for course_id, course in unsaved.items():
+                if self._unsaved_courses.get(course_id) is course:
+                    del self._unsaved_courses[course_id]
+
+    def load_courses(self):
+        return self._load('courses.json')
+
+    def load_professors(self):
+        return self._load('professors.json')
+
+    def load_profiles(self):
+        return self._load('student_profiles.json')
+
+    def load_feedback(self):
+        return self.feedback_log.load()
+
+    def adopt_catalog(self, courses, professors):
+        """Use course/professor lists loaded elsewhere (the catalog snapshot) as the ones to save"""
+        self._loaded['courses.json'] = courses
+        self._loaded['professors.json'] = professors
+        for filename in ('courses.json', 'professors.json'):
+            self._fingerprints[filename] = file_fingerprint(self._path(filename))
+
+    def save_course(self, course):
+        with self._unsaved_lock:
+            self._unsaved_courses[course['id']] = course
+        self.flusher.mark_dirty('courses.json')
+
+    def save_profile(self, profile):
+        self.flusher.mark_dirty('student_profiles.json')
+
+    def append_feedback(self, entries):
+        self.feedback_log.append_many(entries)
+
+    def flush(self):
+        self.flusher.flush()
+        self.feedback_log.flush()
+
+    def close(self):
+        self.flusher.close()
+        self.feedback_log.close()
+
+    def stats(self):
+        return {'backend': self.name, 'writeBehind': self.flusher.stats(), 'feedbackLog': self.feedback_log.stats()}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS courses (
+        id TEXT PRIMARY KEY,
+        department TEXT,
+        difficulty INTEGER,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS courses_department ON courses (department);
+    CREATE INDEX IF NOT EXISTS courses_difficulty ON courses (difficulty);
+
+    CREATE TABLE IF NOT EXISTS course_sections (
+        course_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        time TEXT,
+        location TEXT,
+        data TEXT NOT NULL,
+        PRIMARY KEY (course_id, position)
+    );
+
+    CREATE TABLE IF NOT EXISTS professors (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS professors_name ON professors (name);
+
+    CREATE TABLE IF NOT EXISTS profiles (
+        id TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS feedback (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        course_id TEXT,
+        student_id TEXT,
+        action TEXT,
+        timestamp TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS feedback_course ON feedback (course_id);
+    CREATE INDEX IF NOT EXISTS feedback_student ON feedback (student_id);
+"""
+
+class SQLiteStorage:
+    """One SQLite database (WAL) with a row per course, section, professor, profile and feedback event"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._feedback = []  # the list handed out by load_feedback, kept in step with the table
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def _rows(self, query, params=()):
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def is_empty(self):
+        return not self._rows('SELECT 1 FROM courses LIMIT 1')
+
+    def load_courses(self):
+        # Rows keep their rowid on upsert, so rowid order is the original catalog order
+        sections = {}
+        for course_id, data in self._rows('SELECT course_id, data FROM course_sections ORDER BY course_id, position'):
+            sections.setdefault(course_id, []).append(json.loads(data))
+        courses = []
+        for course_id, data in self._rows('SELECT id, data FROM courses ORDER BY rowid'):
+            course = json.loads(data)
+            if 'schedule' in course:
+                course['schedule'] = sections.get(course_id, [])
+            courses.append(course)
+        return courses
+
+    def load_professors(self):
+        return [json.loads(data) for (data,) in self._rows('SELECT data FROM professors ORDER BY rowid')]
+
+    def load_profiles(self):
+        return [json.loads(data) for (data,) in self._rows('SELECT data FROM profiles ORDER BY rowid')]
+
+    def load_feedback(self):
+        self._feedback = [json.loads(data) for (data,) in self._rows('SELECT data FROM feedback ORDER BY seq')]
+        return self._feedback
+
+    def _write_course(self, course):
+        # Sections live in course_sections; the course row keeps an empty placeholder
+        record = dict(course)
+        if 'schedule' in record:
+            record['schedule'] = []
+        self._db.execute(
+            'INSERT INTO courses (id, department, difficulty, data) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET department = excluded.department, '
+            'difficulty = excluded.difficulty, data = excluded.data',
+            (course['id'], course.get('department'), course.get('difficulty'), json.dumps(record))
+        )
+        self._db.execute('DELETE FROM course_sections WHERE course_id = ?', (course['id'],))
+        self._db.executemany(
+            'INSERT INTO course_sections (course_id, position, time, location, data) VALUES (?, ?, ?, ?, ?)',
+            [(course['id'], position, section.get('time'), section.get('location'), json.dumps(section))
+             for position, section in enumerate(course.get('schedule') or [])]
+        )
+
+    def _write_professor(self, professor):
+        self._db.execute(
+            'INSERT INTO professors (id, name, data) VALUES (?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET name = excluded.name, data = excluded.data',
+            (professor['id'], professor.get('name'), json.dumps(professor))
+        )
+
+    def _write_profile(self, profile):
+        self._db.execute(
+            'INSERT INTO profiles (id, data) VALUES (?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET data = excluded.data',
+            (profile['id'], json.dumps(profile))
+        )
+
+    def _write_feedback(self, entries):
+        self._db.executemany(
+            'INSERT INTO feedback (course_id, student_id, action, timestamp, data) VALUES (?, ?, ?, ?, ?)',
+            [(entry.get('courseId'), entry.get('studentId'), entry.get('action'), entry.get('timestamp'), json.dumps(entry))
+             for entry in entries]
+        )
+
+    def save_course(self, course):
+        with self._lock, self._db:
+            self._write_course(course)
+
+    def save_profile(self, profile):
+        with self._lock, self._db:
+            self._write_profile(profile)
+
+    def append_feedback(self, entries):
+        if not entries:
+            return
+        with self._lock, self._db:
+            self._write_feedback(entries)
+            self._feedback.extend(entries)
+
+    def import_records(self, courses=(), professors=(), profiles=(), feedback=(), if_empty=False):
+        """Bulk-load records in a single transaction; returns False if if_empty and there are courses already"""
+        with self._lock, self._db:
+            # Take the write lock before checking, so concurrent importers cannot both find the database empty
+            self._db.execute('BEGIN IMMEDIATE')
+            if if_empty and self._db.execute('SELECT 1 FROM courses LIMIT 1').fetchone():
+                return False
+            for course in courses:
+                self._write_course(course)
+            for professor in professors:
+                self._write_professor(professor)
+            for profile in profiles:
+                self._write_profile(profile)
+            self._write_feedback(feedback)
+        return True
+
+    def flush(self):
+        pass  # every save commits its own transaction
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self):
+        counts = {}
+        for table in ('courses', 'course_sections', 'professors', 'profiles', 'feedback'):
+            counts[table] = self._rows(f'SELECT COUNT(*) FROM {table}')[0][0]
+        return {'backend': self.name, 'path': self.path, 'rows': counts}
+
+def import_json_data(data_dir, storage):
+    """One-shot copy of the data/*.json files (and the feedback journal) into an empty SQLiteStorage.
+
+    Returns False, importing nothing, if another process filled the database first.
+    """
+    def load(filename):
+        path = os.path.join(data_dir, filename)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    courses = load('courses.json')
+    professors = load('professors.json')
+    profiles = load('student_profiles.json')
+    feedback_log = FeedbackLog(os.path.join(data_dir, 'feedback.json'), os.path.join(data_dir, 'feedback.journal.jsonl'))
+    feedback = feedback_log.load()
+    feedback_log.close()
+    if not storage.import_records(courses, professors, profiles, feedback, if_empty=True):
+        return False
+    print(f"Imported {len(courses)} courses, {len(professors)} professors, "
+          f"{len(profiles)} profiles and {len(feedback)} feedback events into {storage.path}")
+    return True
+
+if __name__ == '__main__':
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_dir, 'data')
+    database_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, 'coursematch.sqlite3')
+    storage = SQLiteStorage(database_path)
+    if not storage.is_empty() or not import_json_data(data_dir, storage):
+        print(f"{database_path} already has data; not importing")
+        storage.close()
+        sys.exit(1)
+    storage.close()
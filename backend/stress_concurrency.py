@@ -0,0 +1,196 @@
+"""
+Concurrency stress test for the in-memory stores.
+Hammers /api/profile, /api/chat, /api/feedback and /api/syllabus/upload from
+many threads at once, then checks that no request failed and that the search
+index, feature matrix, repositories, stored data and analytics still agree
+with a fresh rebuild from the final data.
+
+Each storage backend runs in its own process against a temporary copy of the
+data directory: JSON files (with write-behind, the feedback journal and the
+catalog watcher running at short intervals) and SQLite.
+
+Usage:
+    python stress_concurrency.py [threads] [requests_per_thread]
+"""
+
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKENDS = ('json', 'sqlite')
+DATA_FILES = ('courses.json', 'professors.json', 'student_profiles.json', 'feedback.json')
+
+def run_each_backend():
+    """Run this script once per storage backend, each in a fresh process"""
+    failed = False
+    for backend in BACKENDS:
+        print(f"--- {backend} storage")
+        result = subprocess.run([sys.executable] + sys.argv, env=dict(os.environ, STRESS_BACKEND=backend))
+        failed |= result.returncode != 0
+    return 1 if failed else 0
+
+if __name__ == '__main__' and 'STRESS_BACKEND' not in os.environ:
+    sys.exit(run_each_backend())
+
+# Keep the real data files, cache and Gemini out of the run
+_tmp_dir = tempfile.mkdtemp(prefix='coursematch-stress-')
+_source_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+for filename in DATA_FILES:
+    shutil.copy(os.path.join(_source_dir, filename), _tmp_dir)
+os.environ['DATA_DIR'] = _tmp_dir
+os.environ['STORAGE_BACKEND'] = os.environ.get('STRESS_BACKEND', 'sqlite')
+os.environ['STORAGE_PATH'] = os.path.join(_tmp_dir, 'stress.sqlite3')
+os.environ['LLM_CACHE_PATH'] = ''
+os.environ['GEMINI_API_KEY'] = ''
+# Short intervals so write-behind flushes, journal compaction and catalog reloads happen mid-run
+os.environ['STORAGE_FLUSH_INTERVAL'] = '0.05'
+os.environ['FEEDBACK_COMPACT_EVERY'] = '25'
+os.environ['CATALOG_RELOAD_INTERVAL'] = '0.05'
+
+import numpy as np
+
+import app
+from analytics import FeedbackAnalytics
+from course_index import CourseSearchIndex
+from feedback_log import FeedbackLog
+from prereq_graph import PrerequisiteGraph
+from vector_scoring import CourseFeatureMatrix
+
+QUERIES = [
+    'machine learning', 'data science and statistics', 'easy gened for writing',
+    'entrepreneurship startup', 'CS', 'ECON finance banking', 'history of art', 'python programming'
+]
+INTERESTS = ['AI', 'economics', 'music', 'biology', 'writing', 'robotics', 'policy']
+DEPARTMENTS = ['CS', 'ECON', 'MATH', 'STAT', 'PSYC', 'HIST']
+STUDENTS = [f'stress_student_{i}' for i in range(8)]
+
+def worker(client, rng, requests, failures, counts):
+    course_ids = [course['id'] for course in app.COURSES]
+    for _ in range(requests):
+        roll = rng.random()
+        student_id = rng.choice(STUDENTS)
+        if roll < 0.45:
+            kind = 'chat'
+            response = client.post('/api/chat', json={'studentId': student_id, 'message': rng.choice(QUERIES)})
+            body = response.get_json() or {}
+            ok = response.status_code == 200 and all(
+                course.get('id') in app.COURSE_REPO for course in body.get('courses', [])
+            )
+        elif roll < 0.75:
+            kind = 'profile'
+            response = client.post('/api/profile', json={
+                'id': student_id,
+                'major': [rng.choice(DEPARTMENTS)],
+                'interests': rng.sample(INTERESTS, 2),
+                'careerGoals': [rng.choice(['Data Scientist', 'Economist', 'Software Engineer'])],
+                'typicalDifficultyPreference': rng.randint(1, 5)
+            })
+            ok = response.status_code == 200
+        elif roll < 0.9:
+            kind = 'feedback'
+            response = client.post('/api/feedback', json={
+                'studentId': student_id, 'courseId': rng.choice(course_ids), 'action': 'like'
+            })
+            ok = response.status_code == 200
+        else:
+            kind = 'syllabus'
+            course_id = rng.choice(course_ids[:20])
+            text = f'Syllabus {rng.random()}: topics include {rng.choice(INTERESTS)} and {rng.choice(QUERIES)}'
+            response = client.post('/api/syllabus/upload', data={
+                'courseId': course_id,
+                'file': (io.BytesIO(text.encode('utf-8')), 'syllabus.txt')
+            }, content_type='multipart/form-data')
+            ok = response.status_code == 200
+        counts[kind] = counts.get(kind, 0) + 1
+        if not ok:
+            failures.append((kind, response.status_code, response.get_data(as_text=True)[:200]))
+
+def check_consistency():
+    """Compare the live derived structures with ones rebuilt from the final data"""
+    problems = []
+    fresh_index = CourseSearchIndex(app.COURSES)
+    for query in QUERIES:
+        keywords = app.extract_keywords_from_query(query)
+        if app.COURSE_INDEX.search_slots(keywords) != fresh_index.search_slots(keywords):
+            problems.append(f'search index differs for {query!r}')
+
+    fresh_features = CourseFeatureMatrix(fresh_index, app.find_instructor, PrerequisiteGraph(fresh_index))
+    for student_id in STUDENTS:
+        profile = app.PROFILE_REPO.get(student_id)
+        if profile is None:
+            continue
+        live = app.COURSE_FEATURES.score(profile, ['data'])
+        fresh = fresh_features.score(profile, ['data'])
+        if not np.array_equal(live, fresh):
+            problems.append(f'feature scores differ for {student_id}')
+
+    for i, course in enumerate(app.COURSES):
+        if app.COURSE_REPO.index_of(course['id']) != i or app.COURSE_INDEX.course_at(i) is not course:
+            problems.append(f'course {course["id"]} is out of sync')
+            break
+
+    # Everything written behind the requests has to be on disk now
+    app.CATALOG_WATCHER.stop()
+    app.STORAGE.flush()
+    stored = {profile['id']: profile for profile in app.STORAGE.load_profiles()}
+    for student_id in STUDENTS:
+        if app.PROFILE_REPO.get(student_id) != stored.get(student_id):
+            problems.append(f'stored profile differs for {student_id}')
+    if app.STORAGE.name == 'json':
+        app.STORAGE.close()
+        with open(os.path.join(app.DATA_DIR, 'courses.json')) as f:
+            stored_courses = {course['id']: course for course in json.load(f)}
+        for course in app.COURSES[:20]:
+            if stored_courses.get(course['id'], {}).get('syllabus') != course.get('syllabus'):
+                problems.append(f'stored syllabus differs for {course["id"]}')
+        feedback_log = FeedbackLog(os.path.join(app.DATA_DIR, 'feedback.json'), os.path.join(app.DATA_DIR, 'feedback.journal.jsonl'))
+        stored_feedback = feedback_log.load()
+        feedback_log.close()
+    else:
+        stored_feedback = app.STORAGE.load_feedback()
+    if len(stored_feedback) != len(app.FEEDBACK):
+        problems.append('stored feedback count differs from memory')
+    if app.ANALYTICS.payload() != FeedbackAnalytics(app.FEEDBACK).payload():
+        problems.append('analytics differ from a recount of the feedback')
+    return problems
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    failures = []
+    counts_per_thread = [{} for _ in range(threads)]
+
+    started = time.perf_counter()
+    workers = [
+        threading.Thread(target=worker, args=(app.app.test_client(), random.Random(i), requests, failures, counts_per_thread[i]))
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    counts = {}
+    for thread_counts in counts_per_thread:
+        for kind, count in thread_counts.items():
+            counts[kind] = counts.get(kind, 0) + count
+    print(f"{threads * requests} requests in {elapsed:.2f}s: {counts}")
+
+    problems = [f'{kind} request failed ({status}): {body}' for kind, status, body in failures[:10]]
+    problems += check_consistency()
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    print("OK" if not problems else f"{len(failures)} failed requests, {len(problems)} problems")
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
+    return 0 if not problems else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Conflict-free timetable search.
+Every parsed schedule entry of a course is treated as one section to choose
+from (entries with identical meeting times are merged). A depth-first search
+picks one section per course, tracking the week's taken time as one bitmask,
+and prunes with:
+
+- most-constrained-first course order, re-chosen at every step from the
+  sections still open around the taken time (a course with none ends the branch)
+- a bound: a branch is dropped once even the best fit of its remaining courses,
+  with the fewest days on campus any one of them forces, cannot beat the worst
+  timetable already kept
+
+The best `limit` timetables are kept by preference fit, then by fewer days on
+campus. The search stops early once its time budget is spent.
+"""
+
+import heapq
+import time
+
+from schedule_model import DAYS, SLOTS_PER_DAY, meeting_mask, parse_meeting
+
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+def section_options(course, pinned_time=None):
+    """[(mask, [schedule entries])] of a course's distinct meeting times (just the pinned one if given)"""
+    options = {}
+    for section in course.get('schedule', []):
+        time_string = section.get('time', '')
+        if pinned_time and time_string != pinned_time:
+            continue
+        mask = meeting_mask(time_string)
+        if mask:
+            options.setdefault(mask, []).append(section)
+    if pinned_time and not options and meeting_mask(pinned_time):
+        options[meeting_mask(pinned_time)] = [{'time': pinned_time, 'location': 'TBA'}]
+    return list(options.items())
+
+def preference_fit(mask, pref_mask):
+    """Share of a meeting's time inside the preferred windows (1.0 with no preference)"""
+    if not pref_mask:
+        return 1.0
+    return bin(mask & pref_mask).count('1') / bin(mask).count('1')
+
+def meeting_days(mask):
+    """Bitmask of the weekdays a slot mask touches"""
+    return sum(1 << day for day in range(len(DAYS)) if (mask >> (day * SLOTS_PER_DAY)) & DAY_MASK)
+
+def days_on_campus(mask):
+    return bin(meeting_days(mask)).count('1')
+
+class TimetableSearch:
+    """One search over a cart: entries are (course, pinned section time or None)"""
+
+    def __init__(self, entries, pref_mask=0, limit=10, time_budget=0.5, check_every=256):
+        self.pref_mask = pref_mask
+        self.limit = limit
+        self.time_budget = time_budget
+        self.check_every = check_every
+
+        self.courses = []       # (course, [(mask, sections, fit, days)]) best fit first
+        self.unscheduled = []   # courses without any parsed meeting time (pinned or not); they fit anywhere
+        for course, pinned_time in entries:
+            options = section_options(course, pinned_time)
+            if not options:
+                # Only an unparsed pin ("TBA") leaves a pinned course without options
+                self.unscheduled.append(course)
+                continue
+            scored = [
+                (mask, sections, preference_fit(mask, pref_mask), meeting_days(mask))
+                for mask, sections in options
+            ]
+            scored.sort(key=lambda option: (-option[2], bin(option[3]).count('1')))
+            self.courses.append((course, scored))
+
+        self.best = []          # min-heap of (fit, -days, counter, choices)
+        self.nodes = 0
+        self.complete = True
+        self._counter = 0
+        self._deadline = None
+
+    def run(self):
+        started = time.perf_counter()
+        self._deadline = started + self.time_budget
+        self._search(list(range(len(self.courses))), 0, 0, 0.0, [])
+        self.elapsed = time.perf_counter() - started
+        return sorted(self.best, reverse=True)
+
+    def _out_of_time(self):
+        self.nodes += 1
+        if self.nodes % self.check_every == 0 and time.perf_counter() > self._deadline:
+            self.complete = False
+        return not self.complete
+
+    def _search(self, remaining, taken, taken_days, fit, choices):
+        if self._out_of_time():
+            return
+        if not remaining:
+            self._keep(taken_days, fit, choices)
+            return
+
+        # Most constrained course first; a course with no open section ends this branch
+        open_options = None
+        best_fit = fit
+        fewest_days = 0
+        for position, index in enumerate(remaining):
+            options = [option for option in self.courses[index][1] if not option[0] & taken]
+            if not options:
+                return
+            best_fit += options[0][2]
+            fewest_days = max(fewest_days, min(bin(taken_days | option[3]).count('1') for option in options))
+            if open_options is None or len(options) < len(open_options):
+                chosen_position, open_options = position, options
+
+        if len(self.best) >= self.limit and (round(best_fit, 6), -fewest_days) <= self.best[0][:2]:
+            return
+
+        index = remaining[chosen_position]
+        rest = remaining[:chosen_position] + remaining[chosen_position + 1:]
+        # Best fit first, then whatever adds the fewest days
+        open_options.sort(key=lambda option: (-option[2], bin(taken_days | option[3]).count('1')))
+        for mask, sections, option_fit, days in open_options:
+            choices.append((index, mask, sections))
+            self._search(rest, taken | mask, taken_days | days, fit + option_fit, choices)
+            choices.pop()
+            if not self.complete:
+                return
+
+    def _keep(self, taken_days, fit, choices):
+        fit = round(fit, 6)
+        entry = (fit, -bin(taken_days).count('1'), self._counter, sorted(choices, key=lambda choice: choice[0]))
+        self._counter += 1
+        if len(self.best) < self.limit:
+            heapq.heappush(self.best, entry)
+        elif entry[:2] > self.best[0][:2]:
+            heapq.heapreplace(self.best, entry)
+
+def format_minutes(minutes):
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d}{'am' if hour < 12 else 'pm'}"
+
+def describe_meeting(time_string):
+    """{'days', 'start', 'end'} with am/pm spelled out, for display"""
+    days, start, end = parse_meeting(time_string)
+    return {'days': days, 'start': format_minutes(start), 'end': format_minutes(end)}
@@ -0,0 +1,320 @@
+"""
+Vectorized rule-based course scoring.
+Turns the catalog into a feature matrix once (bitsets for career relevance,
+GenEd and meeting times plus difficulty/department/instructor arrays) so a
+student profile can be scored against every course with a handful of NumPy
+operations; prerequisites come from the compiled PrerequisiteGraph. Scores are
+identical to calculate_match_score.
+"""
+
+import threading
+
+import numpy as np
+
+from schedule_model import MASK_WORDS, meeting_mask, mask_words, preference_mask, preferred_windows
+
+WORD_BITS = 64
+
+class BitsetVocabulary:
+    """Maps string values to bit positions in a growable uint64 bitset matrix"""
+
+    def __init__(self):
+        self.bits = {}
+        self.matrix = np.zeros((0, 1), dtype=np.uint64)
+
+    @property
+    def words(self):
+        return self.matrix.shape[1]
+
+    def copy(self):
+        vocabulary = BitsetVocabulary()
+        vocabulary.bits = dict(self.bits)
+        vocabulary.matrix = self.matrix.copy()
+        return vocabulary
+
+    def resize(self, rows):
+        if rows > self.matrix.shape[0]:
+            grown = np.zeros((rows, self.words), dtype=np.uint64)
+            grown[:self.matrix.shape[0]] = self.matrix
+            self.matrix = grown
+
+    def _bit(self, value):
+        bit = self.bits.get(value)
+        if bit is None:
+            bit = self.bits[value] = len(self.bits)
+            if bit >= self.words * WORD_BITS:
+                widened = np.zeros((self.matrix.shape[0], self.words * 2), dtype=np.uint64)
+                widened[:, :self.words] = self.matrix
+                self.matrix = widened
+        return bit
+
+    def set_row(self, row, values):
+        self.matrix[row] = 0
+        for value in set(values):
+            bit = self._bit(value)
+            self.matrix[row, bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+
+    def mask_of_bits(self, selected):
+        """Bitset row with the bits whose entry in the boolean array selected is set"""
+        packed = np.packbits(np.asarray(selected, dtype=bool), bitorder='little')
+        padded = np.zeros(self.words * 8, dtype=np.uint8)
+        padded[:len(packed)] = packed
+        return padded.view('<u8').astype(np.uint64)
+
+    def mask(self, values):
+        """Bitset row for values; values outside the vocabulary cannot overlap any course"""
+        mask = np.zeros(self.words, dtype=np.uint64)
+        for value in set(values):
+            bit = self.bits.get(value)
+            if bit is not None:
+                mask[bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+        return mask
+
+class FeatureArrays:
+    """One consistent version of the per-course feature arrays"""
+
+    ARRAYS = ('difficulty', 'department', 'has_instructor', 'instructor_rating', 'entrepreneurship')
+
+    def __init__(self):
+        self.careers = BitsetVocabulary()
+        self.gened = BitsetVocabulary()
+        self.department_ids = {}
+        # Distinct meeting times: course bitsets plus one weekly slot mask per time (row = bit)
+        self.meetings = BitsetVocabulary()
+        self.meeting_masks = np.zeros((0, MASK_WORDS), dtype=np.uint64)
+
+        self.difficulty = np.zeros(0, dtype=np.float64)
+        self.department = np.zeros(0, dtype=np.int32)
+        self.has_instructor = np.zeros(0, dtype=bool)
+        self.instructor_rating = np.zeros(0, dtype=np.float64)
+        self.entrepreneurship = np.zeros(0, dtype=bool)
+
+    def copy(self):
+        features = FeatureArrays()
+        features.careers = self.careers.copy()
+        features.gened = self.gened.copy()
+        features.department_ids = dict(self.department_ids)
+        features.meetings = self.meetings.copy()
+        features.meeting_masks = self.meeting_masks.copy()
+        for name in self.ARRAYS:
+            setattr(features, name, getattr(self, name).copy())
+        return features
+
+    def resize(self, rows):
+        if rows <= len(self.difficulty):
+            return
+        rows = max(rows, 2 * len(self.difficulty))
+        for name in self.ARRAYS:
+            current = getattr(self, name)
+            grown = np.zeros(rows, dtype=current.dtype)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+        for vocabulary in (self.careers, self.gened, self.meetings):
+            vocabulary.resize(rows)
+
+    def department_id(self, department):
+        dept_id = self.department_ids.get(department)
+        if dept_id is None:
+            dept_id = self.department_ids[department] = len(self.department_ids)
+        return dept_id
+
+    def set_meetings(self, row, time_strings):
+        """Set a course's meeting-time bits, parsing any time not seen before"""
+        self.meetings.set_row(row, time_strings)
+        known = len(self.meeting_masks)
+        if len(self.meetings.bits) > known:
+            grown = np.zeros((len(self.meetings.bits), MASK_WORDS), dtype=np.uint64)
+            grown[:known] = self.meeting_masks
+            for time_string, bit in self.meetings.bits.items():
+                if bit >= known:
+                    grown[bit] = mask_words(meeting_mask(time_string))
+            self.meeting_masks = grown
+
+class CourseFeatureMatrix:
+    """Per-course feature arrays laid out by CourseSearchIndex slot.
+
+    Keyword matching is delegated to the search index so both share one
+    definition of "keyword matches course". Updates copy the arrays, change
+    the copy and swap it in, so score() never sees a half-written row and
+    never waits for a writer.
+    """
+
+    def __init__(self, index, instructor_lookup, prerequisite_graph):
+        self.index = index
+        self.instructor_lookup = instructor_lookup
+        self.prerequisite_graph = prerequisite_graph
+        self._write_lock = threading.Lock()
+
+        features = FeatureArrays()
+        for slot in index.all_slots():
+            self._write_row(features, slot, index.course_at(slot))
+        self.features = features
+
+    def export_arrays(self):
+        """(vocabularies, arrays) describing the current features, for the catalog snapshot"""
+        features = self.features
+        vocabularies = {
+            'careers': features.careers.bits,
+            'gened': features.gened.bits,
+            'meetings': features.meetings.bits,
+            'department_ids': features.department_ids
+        }
+        arrays = {name: getattr(features, name) for name in FeatureArrays.ARRAYS}
+        for name in ('careers', 'gened', 'meetings'):
+            arrays[name] = getattr(features, name).matrix
+        arrays['meeting_masks'] = features.meeting_masks
+        return vocabularies, arrays
+
+    @classmethod
+    def from_arrays(cls, index, instructor_lookup, prerequisite_graph, vocabularies, arrays):
+        """Rebuild from export_arrays() output; arrays may be read-only since updates copy them"""
+        matrix = cls.__new__(cls)
+        matrix.index = index
+        matrix.instructor_lookup = instructor_lookup
+        matrix.prerequisite_graph = prerequisite_graph
+        matrix._write_lock = threading.Lock()
+
+        features = FeatureArrays()
+        for name in ('careers', 'gened', 'meetings'):
+            vocabulary = getattr(features, name)
+            vocabulary.bits = vocabularies[name]
+            vocabulary.matrix = arrays[name]
+        features.meeting_masks = arrays['meeting_masks']
+        features.department_ids = vocabularies['department_ids']
+        for name in FeatureArrays.ARRAYS:
+            setattr(features, name, arrays[name])
+        matrix.features = features
+        return matrix
+
+    def _write_row(self, features, slot, course):
+        features.resize(slot + 1)
+
+        features.careers.set_row(slot, course.get('careerRelevance', []))
+        features.gened.set_row(slot, course.get('gened', []))
+        # Only times that parse count as meetings, as in schedule_model.course_meetings
+        features.set_meetings(slot, [
+            section.get('time', '') for section in course.get('schedule', [])
+            if meeting_mask(section.get('time', ''))
+        ])
+        features.difficulty[slot] = course.get('difficulty', 3)
+        features.department[slot] = features.department_id(course.get('department'))
+
+        instructor = self.instructor_lookup(course)
+        features.has_instructor[slot] = instructor is not None
+        features.instructor_rating[slot] = instructor.get('rating', 0) if instructor else 0
+        features.entrepreneurship[slot] = bool(instructor.get('entrepreneurship')) if instructor else False
+
+    def update_course(self, course):
+        """(Re)compute the feature row of a course after it was added to or changed in the index"""
+        self.update_courses([course])
+
+    def update_courses(self, courses):
+        """Recompute the rows of several courses and publish them as one new version"""
+        with self._write_lock:
+            features = self.features.copy()
+            for course in courses:
+                slot = self.index.slot_of(course['id'])
+                if slot is not None:
+                    self._write_row(features, slot, course)
+            self.features = features
+
+    def _keyword_mask(self, slots_matched, slots, rows):
+        mask = np.zeros(rows, dtype=bool)
+        if slots_matched:
+            mask[list(slots_matched)] = True
+        return mask[slots]
+
+    def _features_for(self, slots):
+        features = self.features
+        if len(slots) and slots.max() >= len(features.difficulty):
+            # Courses the index already has but whose rows are still being written
+            features = features.copy()
+            features.resize(int(slots.max()) + 1)
+        return features
+
+    def conflicts(self, busy_mask, slots):
+        """Boolean array: True where every parsed section of the course overlaps busy_mask"""
+        slots = np.asarray(slots, dtype=np.int64)
+        features = self._features_for(slots)
+        if not len(slots) or not busy_mask:
+            return np.zeros(len(slots), dtype=bool)
+        # Meeting times that hit busy time, then courses whose times all do
+        hit = np.any(features.meeting_masks & mask_words(busy_mask), axis=1)
+        hit_bits = features.meetings.mask_of_bits(hit)
+        meetings = features.meetings.matrix[slots]
+        return np.any(meetings, axis=1) & ~np.any(meetings & ~hit_bits, axis=1)
+
+    def column(self, name, slots):
+        """One of FeatureArrays.ARRAYS for the given slots"""
+        slots = np.asarray(slots, dtype=np.int64)
+        return getattr(self._features_for(slots), name)[slots]
+
+    def gened_coverage(self, requirements, slots):
+        """Per slot, a mask with bit i set when the course satisfies requirements[i]"""
+        slots = np.asarray(slots, dtype=np.int64)
+        features = self._features_for(slots)
+        coverage = np.zeros(len(slots), dtype=np.int64)
+        for i, requirement in enumerate(requirements):
+            bit = features.gened.bits.get(requirement)
+            if bit is not None:
+                column = features.gened.matrix[slots, bit // WORD_BITS] >> np.uint64(bit % WORD_BITS)
+                coverage |= (column & np.uint64(1)).astype(np.int64) << i
+        return coverage
+
+    def score(self, student_profile, query_keywords=None, slots=None):
+        """Rule-based match scores for the given slots (every indexed course by default)"""
+        if slots is None:
+            slots = self.index.all_slots()
+        slots = np.asarray(slots, dtype=np.int64)
+        scores = np.zeros(len(slots), dtype=np.int64)
+        if not len(slots):
+            return scores
+        features = self._features_for(slots)
+        rows = len(features.difficulty)
+
+        # Career relevance
+        career_mask = features.careers.mask(student_profile.get('careerGoals', []))
+        scores += 30 * np.any(features.careers.matrix[slots] & career_mask, axis=1)
+
+        # Keyword matching: department match beats a text match for the same keyword
+        if query_keywords:
+            for kw in query_keywords:
+                dept_match = self._keyword_mask(self.index.department_matches(kw), slots, rows)
+                text_match = self._keyword_mask(self.index.text_matches(kw), slots, rows)
+                scores += 20 * dept_match + 15 * (text_match & ~dept_match)
+
+        # Difficulty preference
+        diff_diff = np.abs(features.difficulty[slots] - student_profile.get('typicalDifficultyPreference', 3))
+        scores += np.where(diff_diff == 0, 15, np.where(diff_diff == 1, 10, 0))
+
+        # Prerequisites: all met, partially met, or none met
+        all_met, some_met = self.prerequisite_graph.slot_status(student_profile.get('completedCourses', []), rows)
+        all_met, some_met = all_met[slots], some_met[slots]
+        scores += np.where(all_met, 20, np.where(some_met, 10, -10))
+
+        # GenEd relevance
+        gened_mask = features.gened.mask(student_profile.get('genedRemaining', []))
+        scores += 20 * np.any(features.gened.matrix[slots] & gened_mask, axis=1)
+
+        # Department alignment with major/minor
+        aligned_ids = [
+            features.department_ids[dept]
+            for dept in student_profile.get('major', []) + student_profile.get('minor', [])
+            if dept in features.department_ids
+        ]
+        scores += 15 * np.isin(features.department[slots], aligned_ids)
+
+        # Time-of-day preference: some section lies entirely inside the preferred windows
+        pref_mask = preference_mask(preferred_windows(student_profile, query_keywords))
+        if pref_mask:
+            fitting = ~np.any(features.meeting_masks & ~mask_words(pref_mask), axis=1)
+            fit_bits = features.meetings.mask_of_bits(fitting)
+            scores += 10 * np.any(features.meetings.matrix[slots] & fit_bits, axis=1)
+
+        # Instructor rating and entrepreneurship background
+        has_instructor = features.has_instructor[slots]
+        scores += 10 * (has_instructor & (features.instructor_rating[slots] >= 4.5))
+        if query_keywords and any('entrepreneur' in kw.lower() or 'startup' in kw.lower() for kw in query_keywords):
+            scores += 15 * (has_instructor & features.entrepreneurship[slots])
+
+        return np.maximum(scores, 0)
@@ -0,0 +1,116 @@
+"""
+Write-behind persistence for whole-file collections.
+Requests only mark a collection dirty; a background thread coalesces the
+changes and writes each dirty collection once per interval, or sooner when
+enough changes pile up. Files are written to a temp file, fsynced and swapped
+in with os.replace, so a crash never leaves a half-written file behind.
+"""
+
+import json
+import os
+import threading
+import time
+
+def file_fingerprint(path):
+    """(size, mtime) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+def atomic_write_json(path, data, indent=2, default=None):
+    """Write data as JSON to path via a temp file and os.replace"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent, default=default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class WriteBehindFlusher:
+    """Coalesces mark_dirty() calls per collection and writes them from a background thread"""
+
+    def __init__(self, write, interval=2.0, max_pending=50):
+        self.write = write              # write(name) persists one collection
+        self.interval = interval
+        self.max_pending = max_pending
+
+        self._dirty = {}                # name -> monotonic time of the oldest unflushed change
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self.flushes = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_flush_seconds = None
+        self.last_flush_lag = None
+        self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._worker.start()
+
+    def mark_dirty(self, name):
+        with self._lock:
+            if name in self._dirty:
+                self.coalesced += 1
+            else:
+                self._dirty[name] = time.monotonic()
+            self._pending += 1
+            if self._pending >= self.max_pending:
+                self._wake.set()
+
+    def flush(self):
+        """Write every dirty collection now"""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                self._pending = 0
+            if not dirty:
+                return
+            started = time.monotonic()
+            for name, dirty_since in dirty.items():
+                try:
+                    self.write(name)
+                    self.writes += 1
+                except Exception as e:
+                    # Keep it dirty so the next round retries
+                    self.errors += 1
+                    print(f"Error writing {name}: {e}")
+                    with self._lock:
+                        self._dirty.setdefault(name, dirty_since)
+            finished = time.monotonic()
+            self.flushes += 1
+            self.last_flush_seconds = round(finished - started, 4)
+            self.last_flush_lag = round(finished - min(dirty.values()), 4)
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and write anything still dirty"""
+        self._closed.set()
+        self._wake.set()
+        self._worker.join(timeout=self.interval + 5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            oldest = min(self._dirty.values()) if self._dirty else None
+            return {
+                'dirty': sorted(self._dirty),
+                'pendingChanges': self._pending,
+                # Age of the oldest change not yet on disk
+                'flushLagSeconds': round(now - oldest, 4) if oldest is not None else 0.0,
+                'lastFlushLagSeconds': self.last_flush_lag,
+                'lastFlushSeconds': self.last_flush_seconds,
+                'flushes': self.flushes,
+                'writes': self.writes,
+                'coalesced': self.coalesced,
+                'errors': self.errors
+            }